@@ -1,10 +1,13 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Profile, Location
+from . import ledger
+from .models import User, Profile, Location, OutboundEmail, BalanceTransaction
 
 
 class UserAdmin(BaseUserAdmin):
     list_display = ['username', 'email', 'get_country', 'get_phone']
+    list_select_related = ['profile']
 
     def get_country(self, obj):
         return obj.profile.country if hasattr(obj, 'profile') else "-"
@@ -17,11 +20,70 @@ class UserAdmin(BaseUserAdmin):
 admin.site.register(User, UserAdmin)
 
 
+class ProfileAdminForm(forms.ModelForm):
+    balance_adjustment = forms.DecimalField(
+        max_digits=12, decimal_places=2, required=False,
+        help_text="Added to the balance (negative to deduct), recorded as an adjustment transaction.",
+    )
+    adjustment_reference = forms.CharField(max_length=100, required=False)
+
+    class Meta:
+        model = Profile
+        fields = '__all__'
+
+    def clean_balance_adjustment(self):
+        amount = self.cleaned_data['balance_adjustment']
+        if amount and self.instance.balance + amount < 0:
+            raise forms.ValidationError("The balance doesn't cover this deduction.")
+        return amount
+
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'full_name', 'phone','phone_is_verified', 'country', 'available_to_create_car']
+    form = ProfileAdminForm
+    list_display = ['user', 'full_name', 'phone','phone_is_verified', 'country', 'available_to_create_car', 'balance']
+    # Balance changes go through authentication.ledger (balance_adjustment)
+    readonly_fields = ['balance']
+
+    # Profiles are created with their user, opening balance included
+    def has_add_permission(self, request):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        # Only write what was edited: saving the whole row would put back the
+        # balance loaded with the form over any ledger change made since
+        fields = {field.name for field in Profile._meta.concrete_fields}
+        obj.save(update_fields=[name for name in form.changed_data if name in fields])
+
+        amount = form.cleaned_data.get('balance_adjustment')
+        if amount:
+            apply = ledger.credit if amount > 0 else ledger.debit
+            try:
+                apply(obj, abs(amount), BalanceTransaction.KIND_ADJUSTMENT, form.cleaned_data['adjustment_reference'])
+            except ledger.InsufficientBalance:
+                self.message_user(request, "The balance no longer covers this deduction.", messages.ERROR)
 
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+
+
+@admin.register(BalanceTransaction)
+class BalanceTransactionAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'kind', 'amount', 'balance_after', 'reference', 'created_at']
+    list_filter = ['kind']
+    list_select_related = ['profile']
+
+    # Append-only: corrections are new (adjustment) rows
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
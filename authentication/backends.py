@@ -0,0 +1,29 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .models import User, optimized_user_queryset
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with email + password.
+
+    The user is fetched together with its profile and location in a single
+    joined query, so the login response can be serialized without extra
+    lookups.
+    """
+
+    def authenticate(self, request, email=None, password=None):
+        if email is None or password is None:
+            return None
+
+        try:
+            user = optimized_user_queryset().get(email=email)
+        except User.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            User().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
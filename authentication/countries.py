@@ -0,0 +1,63 @@
+"""
+Country registry backed by authentication/data/countries.json.
+
+The file is parsed once per process into read-only lookup tables, together
+with the pre-serialized CountrySerializer output, so serializers and the
+public countries endpoint never scan the full list.
+"""
+import hashlib
+import json
+import os
+from functools import cache
+from types import MappingProxyType
+
+from django.conf import settings
+
+COUNTRIES_FILE = os.path.join(settings.BASE_DIR, 'authentication/data/countries.json')
+
+
+@cache
+def _registry():
+    from .serializers import CountrySerializer
+
+    with open(COUNTRIES_FILE, 'rb') as f:
+        raw = f.read()
+
+    countries = tuple(MappingProxyType(c) for c in json.loads(raw))
+    serialized = tuple(
+        MappingProxyType(dict(data))
+        for data in CountrySerializer(countries, many=True).data
+    )
+
+    return MappingProxyType({
+        "countries": countries,
+        "by_id": MappingProxyType({c["id"]: c for c in countries}),
+        "by_abbreviation": MappingProxyType({c["abbreviation"]: c for c in countries}),
+        "serialized": serialized,
+        "serialized_by_abbreviation": MappingProxyType({c["abbreviation"]: c for c in serialized}),
+        "etag": hashlib.sha256(raw).hexdigest(),
+    })
+
+
+def get_country_by_id(country_id):
+    return _registry()["by_id"].get(country_id)
+
+
+def get_country_by_abbreviation(abbreviation):
+    return _registry()["by_abbreviation"].get(abbreviation)
+
+
+def serialized_country(abbreviation):
+    """CountrySerializer output for the given abbreviation, or None."""
+    data = _registry()["serialized_by_abbreviation"].get(abbreviation)
+    return dict(data) if data else None
+
+
+def serialized_countries():
+    """CountrySerializer output for every country, in file order."""
+    return _registry()["serialized"]
+
+
+def countries_etag():
+    """Content hash of countries.json, stable for the life of the process."""
+    return _registry()["etag"]
@@ -0,0 +1,186 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template import Context
+from django.template.loader import get_template
+from django.utils.timezone import now
+
+from qent.metrics import EMAILS_QUEUED
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+RESET_CODE_EXPIRY_MINUTES = 10
+
+
+def compiled_template(template_name):
+    """
+    Resolve an email template. Outside DEBUG the cached template loader
+    keeps it parsed for the life of the process; in DEBUG edits show up on
+    the next email.
+    """
+    return get_template(template_name).template
+
+
+def batch_context():
+    """Base context shared by every email of a batch: the static, per-batch values."""
+    return Context({"year": now().year})
+
+
+def render_html(outbound, context):
+    """
+    Render one outbound email's HTML body on top of the shared batch
+    context, with only its own variables pushed. Returns None for plain-text
+    emails.
+    """
+    if not outbound.template_name:
+        return None
+    with context.push(outbound.context):
+        return compiled_template(outbound.template_name).render(context)
+
+
+def render_html_batch(outbounds):
+    """
+    Render the HTML bodies for a batch of outbound emails.
+
+    Templates come from the cached template loader and every message
+    shares one base context. Returns one body (or None) per email.
+    """
+    context = batch_context()
+    return [render_html(outbound, context) for outbound in outbounds]
+
+
+def enqueue_emails(emails):
+    """Queue many OutboundEmail instances (e.g. a bulk notification) in one insert."""
+    created = OutboundEmail.objects.bulk_create(emails, batch_size=500)
+    EMAILS_QUEUED.inc(len(created))
+    return created
+
+
+def reset_code_email(user, code):
+    return OutboundEmail(
+        to=user.email,
+        subject="Qent – Reset Your Password",
+        text_body=f"This is your reset password code: {code}",
+        template_name="emails/reset_password.html",
+        context={
+            "name": user.profile.full_name.split()[0] if user.profile.full_name else user.username,
+            "code": code,
+            "expiry_minutes": RESET_CODE_EXPIRY_MINUTES,
+        },
+    )
+
+
+def enqueue_reset_code_email(user, code):
+    """Queue the reset-code email; delivery happens in send_queued_emails."""
+    email = reset_code_email(user, code)
+    email.save()
+    EMAILS_QUEUED.inc()
+    return email
+
+
+async def aenqueue_reset_code_email(user, code):
+    """enqueue_reset_code_email() for async views."""
+    email = reset_code_email(user, code)
+    await email.asave()
+    EMAILS_QUEUED.inc()
+    return email
+
+
+def build_message(outbound, html_content=None, connection=None):
+    message = EmailMultiAlternatives(
+        outbound.subject,
+        outbound.text_body,
+        settings.DEFAULT_FROM_EMAIL,
+        [outbound.to],
+        connection=connection,
+    )
+    if html_content is not None:
+        message.attach_alternative(html_content, "text/html")
+    return message
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base ... capped at an hour."""
+    return timedelta(seconds=min(settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), 3600))
+
+
+def claim_batch(batch_size):
+    """
+    Lease a batch of due emails to this worker.
+
+    Rows are locked with SKIP LOCKED (where the database supports it) only
+    while the batch is claimed: the attempt is counted and next_attempt_at is
+    pushed out by EMAIL_OUTBOX_LEASE_SECONDS, then the transaction commits.
+    Other workers skip leased rows, and if this one dies mid-batch the rows
+    become due again once the lease runs out.
+    """
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        lease_until = now() + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        for outbound in batch:
+            outbound.attempts += 1
+            outbound.next_attempt_at = lease_until
+        OutboundEmail.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def mark_failed(outbound, exc):
+    logger.warning("Sending email %s failed (attempt %s): %s", outbound.pk, outbound.attempts, exc)
+    outbound.last_error = str(exc)
+    if outbound.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        outbound.status = OutboundEmail.STATUS_FAILED
+    else:
+        outbound.next_attempt_at = now() + retry_delay(outbound.attempts)
+
+
+def send_queued_emails(batch_size=None):
+    """
+    Deliver one batch of due emails over a single backend connection.
+
+    The batch is claimed in a short transaction (see claim_batch) and sent
+    outside of it, so several workers can drain the outbox concurrently and
+    a rollback can never un-send mail. If the connection can't be opened,
+    every claimed email counts as a failed attempt. Returns (sent, failed)
+    counts for the batch.
+    """
+    batch = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    context = batch_context()
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        for outbound in batch:
+            mark_failed(outbound, exc)
+        failed = len(batch)
+    else:
+        try:
+            for outbound in batch:
+                try:
+                    # A broken template fails only its own email
+                    build_message(outbound, render_html(outbound, context), connection).send()
+                except Exception as exc:
+                    failed += 1
+                    mark_failed(outbound, exc)
+                else:
+                    sent += 1
+                    outbound.status = OutboundEmail.STATUS_SENT
+                    outbound.sent_at = now()
+                    outbound.last_error = ""
+        finally:
+            connection.close()
+
+    OutboundEmail.objects.bulk_update(batch, ['status', 'last_error', 'next_attempt_at', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the work factor taken from settings.PASSWORD_HASH_ITERATIONS.
+
+    Hashes stored with a different iteration count are flagged by
+    `must_update`, so Django re-hashes them on the user's next successful
+    login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,49 @@
+"""
+Balance changes. Every change is a conditional UPDATE ... SET balance =
+balance + amount in the database (no read-modify-write in Python) plus an
+append-only BalanceTransaction row, in one transaction.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import BalanceTransaction, Profile
+
+
+class InsufficientBalance(Exception):
+    pass
+
+
+def _apply(profile, amount, kind, reference):
+    with transaction.atomic():
+        profiles = Profile.objects.filter(pk=profile.pk)
+        if amount < 0:
+            # Only succeeds while the balance covers the debit, so concurrent
+            # debits can never take it below zero
+            profiles = profiles.filter(balance__gte=-amount)
+        if not profiles.update(balance=F("balance") + amount):
+            raise InsufficientBalance()
+
+        # The UPDATE holds the row lock until commit, so this is our balance
+        profile.balance = Profile.objects.values_list("balance", flat=True).get(pk=profile.pk)
+        return BalanceTransaction.objects.create(
+            profile=profile, kind=kind, amount=amount, balance_after=profile.balance, reference=reference,
+        )
+
+
+def debit(profile, amount, kind, reference=""):
+    """Take `amount` from the balance; raises InsufficientBalance if it doesn't cover it."""
+    return _apply(profile, -Decimal(amount), kind, reference)
+
+
+def credit(profile, amount, kind, reference=""):
+    return _apply(profile, Decimal(amount), kind, reference)
+
+
+def record_opening_balance(profile):
+    """Ledger row for the balance a new profile starts with."""
+    return BalanceTransaction.objects.create(
+        profile=profile, kind=BalanceTransaction.KIND_OPENING,
+        amount=profile.balance, balance_after=profile.balance,
+    )
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication.emails import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails in batches, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Emails per batch (default: EMAIL_OUTBOX_BATCH_SIZE)")
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting when it is drained")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep between polls when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_emails(options["batch_size"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("✅ Outbox drained"))
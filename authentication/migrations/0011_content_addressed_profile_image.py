@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:39
+
+import authentication.models
+import qent.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=models.ImageField(blank=True, default='default/profile/profile.svg', null=True, storage=qent.storage.ContentAddressedStorage(), upload_to=authentication.models.user_profile_image_path),
+        ),
+    ]
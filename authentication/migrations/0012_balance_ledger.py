@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    Profile = apps.get_model('authentication', 'Profile')
+    BalanceTransaction = apps.get_model('authentication', 'BalanceTransaction')
+    BalanceTransaction.objects.bulk_create(
+        (
+            BalanceTransaction(profile_id=pk, kind='opening', amount=balance, balance_after=balance)
+            for pk, balance in Profile.objects.values_list('pk', 'balance').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0011_content_addressed_profile_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('5000.00'), max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='BalanceTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('opening', 'Opening balance'), ('subscription', 'Car subscription'), ('top_up', 'Top up'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_transactions', to='authentication.profile')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['profile', 'id'], name='balance_tx_profile_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0012_balance_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='national_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0013_profile_national_id_nullable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_renditions_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
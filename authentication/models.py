@@ -1,6 +1,10 @@
 import uuid, os
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from qent.storage import content_addressed_storage
 
 
 # Create your models here.
@@ -28,6 +32,7 @@ class Location(models.Model):
 
 class User(AbstractUser):
     username = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    email = models.EmailField("email address", blank=True, db_index=True)
 
     def save(self, *args, **kwargs):
         if not self.username:
@@ -39,10 +44,13 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     image = models.ImageField(
         upload_to=user_profile_image_path,
+        storage=content_addressed_storage,
         blank=True,
         null=True,
         default='default/profile/profile.svg'
     )
+    # Set once qent.renditions wrote the resized copies (see srcset())
+    image_renditions_ready = models.BooleanField(default=False)
     full_name = models.CharField(max_length=255, null=False, blank=False)
     country = models.CharField(max_length=3, default='PS')
     phone = models.CharField(max_length=20, null=False, blank=False, default='')
@@ -52,6 +60,92 @@ class Profile(models.Model):
     location = models.ForeignKey(Location, on_delete=models.PROTECT, default=1)
     available_to_create_car = models.BooleanField(default=False)
 
-    balance = models.FloatField(default=5000)
+    # Only changed through authentication.ledger, which records every change
+    # as a BalanceTransaction
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("5000.00"))
     national_id = models.IntegerField(null=True, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
+
+
+
+class BalanceTransaction(models.Model):
+    """
+    Append-only ledger of balance changes. The rows of a profile add up to
+    its current balance; balance_after is the balance right after the row.
+    """
+    KIND_OPENING = 'opening'
+    KIND_SUBSCRIPTION = 'subscription'
+    KIND_TOP_UP = 'top_up'
+    KIND_ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (KIND_OPENING, 'Opening balance'),
+        (KIND_SUBSCRIPTION, 'Car subscription'),
+        (KIND_TOP_UP, 'Top up'),
+        (KIND_ADJUSTMENT, 'Adjustment'),
+    ]
+
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='balance_transactions')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    reference = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['profile', 'id'], name='balance_tx_profile_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Balance transactions are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Balance transactions are append-only.")
+
+    def __str__(self):
+        return f"{self.profile_id}: {self.amount:+} ({self.kind})"
+
+
+class OutboundEmail(models.Model):
+    """
+    Durable outbox row. Requests enqueue emails here and return immediately;
+    the send_queued_emails worker renders and delivers them with retries.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField()
+    template_name = models.CharField(max_length=255, blank=True)
+    context = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+def optimized_user_queryset():
+    """Users with profile and location joined in, as UserSerializer expects."""
+    return User.objects.select_related("profile__location")
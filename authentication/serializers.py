@@ -1,14 +1,9 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
-from .models import User, Profile, Location
+from .countries import get_country_by_id, serialized_country
+from .models import User, Profile, Location, optimized_user_queryset
 from rest_framework import serializers
-from django.conf import settings
-import os, json
-
-COUNTRIES_FILE = os.path.join(settings.BASE_DIR, 'authentication/data/countries.json')
-with open(COUNTRIES_FILE, 'r', encoding='utf-8') as f:
-    COUNTRIES = json.load(f)
-COUNTRY_CODES = [c["id"] for c in COUNTRIES]
 
 
 class CountrySerializer(serializers.Serializer):
@@ -24,15 +19,28 @@ class LocationSerializer(serializers.Serializer):
     lng = serializers.FloatField()
 
 
+class CountryField(serializers.ReadOnlyField):
+    """Stored country abbreviation -> pre-serialized country object."""
+
+    def to_representation(self, value):
+        return serialized_country(value) if value else None
+
+
 class UserSerializer(serializers.ModelSerializer):
-    country = serializers.SerializerMethodField()
-    location = serializers.SerializerMethodField()
-    phone = serializers.SerializerMethodField()
-    phone_is_verified = serializers.SerializerMethodField()
-    full_name = serializers.SerializerMethodField()
-    balance = serializers.SerializerMethodField()
-    national_id=serializers.SerializerMethodField()
-    date_of_birth=serializers.SerializerMethodField()
+    """
+    Flattened user + profile read model.
+
+    Expects a user loaded with select_related("profile__location")
+    (see optimized_user_queryset) so serializing costs no extra queries.
+    """
+    full_name = serializers.CharField(source="profile.full_name", read_only=True)
+    phone = serializers.CharField(source="profile.phone", read_only=True)
+    phone_is_verified = serializers.BooleanField(source="profile.phone_is_verified", read_only=True)
+    country = CountryField(source="profile.country")
+    location = LocationSerializer(source="profile.location", read_only=True)
+    balance = serializers.FloatField(source="profile.balance", read_only=True)
+    national_id = serializers.IntegerField(source="profile.national_id", read_only=True)
+    date_of_birth = serializers.DateField(source="profile.date_of_birth", read_only=True)
 
     class Meta:
         model = User
@@ -50,39 +58,6 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'email']
 
-    def get_full_name(self, obj):
-        return obj.profile.full_name if hasattr(obj, "profile") else None
-
-    def get_phone(self, obj):
-        return obj.profile.phone if hasattr(obj, "profile") else None
-
-    def get_phone_is_verified(self, obj):
-        return obj.profile.phone_is_verified if hasattr(obj, "profile") else False
-
-    def get_country(self, obj):
-        """
-        Map stored country code -> full country object using CountrySerializer
-        """
-        if hasattr(obj, "profile") and obj.profile.country:
-            country_obj = next(
-                (c for c in COUNTRIES if c["abbreviation"] == obj.profile.country), None
-            )
-            if country_obj:
-                return CountrySerializer(country_obj).data
-        return None
-
-    def get_location(self, obj):
-        if hasattr(obj, "profile") and obj.profile.location:
-            return LocationSerializer(obj.profile.location).data
-        return None
-
-    def get_balance(self, obj):
-        return obj.profile.balance if hasattr(obj, "profile") else None
-
-    def get_national_id(self, obj):
-        return obj.profile.national_id if hasattr(obj, "profile") else None
-    def get_date_of_birth(self, obj):
-        return obj.profile.date_of_birth if hasattr(obj, "profile") else None
 
 class ProfileSerializer(serializers.ModelSerializer):
     location = LocationSerializer(read_only=True)  # for output
@@ -92,7 +67,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    country = serializers.SerializerMethodField()
+    country = CountryField()
     country_id = serializers.IntegerField(write_only=True, required=False)
     email = serializers.EmailField(write_only=True, required=False)  # add email here
 
@@ -113,45 +88,41 @@ class ProfileSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["phone_is_verified"]
 
-    def get_country(self, obj):
-        country_obj = next((c for c in COUNTRIES if c["abbreviation"] == obj.country), None)
-        if country_obj:
-            return CountrySerializer(country_obj).data
-        return None
-
     def update(self, instance, validated_data):
+        update_fields = set()
         new_phone = validated_data.get("phone")
         if new_phone and new_phone != instance.phone:
             instance.phone_is_verified = False
+            update_fields.add("phone_is_verified")
 
         # Handle country
         country_id = validated_data.pop("country_id", None)
         if country_id:
-            country_obj = next((c for c in COUNTRIES if c["id"] == country_id), None)
+            country_obj = get_country_by_id(country_id)
             if not country_obj:
                 raise serializers.ValidationError({"country_id": "Invalid country ID"})
             validated_data["country"] = country_obj["abbreviation"]
 
-        # Handle User updates (email, full_name, etc.)
+        # Email lives on the User
         user = instance.user
         email = validated_data.pop("email", None)
-        if email:
+        if email and email != user.email:
             user.email = email
+            user.save(update_fields=["email"])
 
-        full_name = validated_data.pop("full_name", None)
-        if full_name:
-            user.full_name = full_name
-
-        user.save()
+        # Now update only the Profile fields that were sent
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+            update_fields.add(attr)
 
-        # Now update only Profile fields
-        return super().update(instance, validated_data)
+        if update_fields:
+            instance.save(update_fields=update_fields)
+        return instance
 
     def to_representation(self, instance):
-        user_data = UserSerializer(instance.user).data
-        profile_data = super().to_representation(instance)
-        merged = {**user_data, **profile_data}
-        return {"data": merged}
+        # The user read model already carries every profile field but this one
+        user_data = UserSerializer(instance.user, context=self.context).data
+        return {"data": {**user_data, "available_to_create_car": instance.available_to_create_car}}
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -181,7 +152,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def validate_country_id(self, value):
         """Ensure the country ID exists and return abbreviation."""
-        country_obj = next((c for c in COUNTRIES if c["id"] == value), None)
+        country_obj = get_country_by_id(value)
         if not country_obj:
             raise serializers.ValidationError("Invalid country ID")
         return country_obj["abbreviation"]
@@ -209,36 +180,48 @@ class RegisterSerializer(serializers.ModelSerializer):
 
         return attrs
 
-    def create(self, validated_data):
-        password = validated_data.pop('password')
-        country_abbr = validated_data.pop("country_id")  # store abbreviation
-        location_id = validated_data.pop("location_id")
-        full_name = validated_data.pop("full_name")
-        phone = validated_data.pop("phone")
-        available_to_create_car = validated_data.pop("available_to_create_car", False)
-        national_id = validated_data.pop("national_id", None)
-        date_of_birth = validated_data.pop("date_of_birth", None)
+    PROFILE_FIELDS = [
+        "full_name", "phone", "country", "location", "available_to_create_car",
+        "national_id", "date_of_birth",
+    ]
+
+    def fill_profile(self, profile, validated_data):
+        profile.full_name = validated_data["full_name"]
+        profile.phone = validated_data["phone"]
+        profile.country = validated_data["country_id"]  # abbreviation, see validate_country_id
+        profile.location_id = validated_data["location_id"]
+        profile.available_to_create_car = validated_data.get("available_to_create_car", False)
+
+        if profile.available_to_create_car:
+            profile.national_id = validated_data.get("national_id")
+            profile.date_of_birth = validated_data.get("date_of_birth")
 
+    def create(self, validated_data):
         # create user
         user = User(email=validated_data["email"])
-        user.set_password(password)
+        user.set_password(validated_data["password"])
         user.save()
 
-        # update profile
-        profile = user.profile
-        profile.full_name = full_name
-        profile.phone = phone
-        profile.country = country_abbr
-        profile.location_id = location_id
-        profile.available_to_create_car = available_to_create_car
+        # update profile (created by the post_save signal)
+        self.fill_profile(user.profile, validated_data)
+        user.profile.save(update_fields=self.PROFILE_FIELDS)
 
-        if available_to_create_car:
-            profile.national_id = national_id
-            profile.date_of_birth = date_of_birth
+        # Re-read as UserSerializer expects, instead of lazy-loading the location
+        return optimized_user_queryset().get(pk=user.pk)
 
-        profile.save()
+    async def acreate(self, validated_data):
+        """
+        create() for the async RegisterView: the password is hashed off the
+        event loop and both rows are written through the async ORM.
+        """
+        user = User(email=validated_data["email"])
+        await sync_to_async(user.set_password)(validated_data["password"])
+        await user.asave()
+
+        self.fill_profile(user.profile, validated_data)
+        await user.profile.asave(update_fields=self.PROFILE_FIELDS)
 
-        return user
+        return await optimized_user_queryset().aget(pk=user.pk)
 
 
 class LoginSerializer(serializers.Serializer):
@@ -246,13 +229,12 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField()
 
     def validate(self, data):
-        try:
-            user_obj = User.objects.get(email=data['email'])
-        except User.DoesNotExist:
-            raise serializers.ValidationError({"login_error": ["User not found"]})
-
-        user = authenticate(username=user_obj.username, password=data["password"])
+        # EmailBackend resolves user + profile + location in one query
+        user = authenticate(self.context.get("request"), email=data["email"], password=data["password"])
         if not user:
+            # Only failed logins pay for the extra lookup
+            if not User.objects.filter(email=data["email"]).exists():
+                raise serializers.ValidationError({"login_error": ["User not found"]})
             raise serializers.ValidationError({"login_error": ["Wrong password"]})
         refresh = RefreshToken.for_user(user)
         return {
@@ -286,7 +268,7 @@ class ResetPasswordSerializer(serializers.Serializer):
         token = AccessToken(data['reset_token'])
 
         try:
-            user = User.objects.get(id=token['user_id'])
+            user = User.objects.select_related("profile").get(id=token['user_id'])
         except User.DoesNotExist:
             raise serializers.ValidationError({"message": "User does not exist"})
 
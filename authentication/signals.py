@@ -1,10 +1,27 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
+from qent.renditions import generate_and_flag, is_new_upload
+from .ledger import record_opening_balance
 from .models import User, Profile
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, **kwargs):
+    # Profile changes are saved explicitly (with update_fields) by the code
+    # that makes them; re-saving here would rewrite the row on every User save.
     if created:
-        Profile.objects.create(user=instance, full_name=instance.username or "", balance=5000)
-    else:
-        instance.profile.save()
\ No newline at end of file
+        profile = Profile.objects.create(user=instance, full_name=instance.username or "")
+        record_opening_balance(profile)
+
+
+@receiver(pre_save, sender=Profile)
+def note_profile_image_upload(sender, instance, raw, update_fields, **kwargs):
+    instance._image_uploaded = (
+        not raw and (update_fields is None or "image" in update_fields) and is_new_upload(instance.image)
+    )
+
+
+@receiver(post_save, sender=Profile)
+def generate_profile_image_renditions(sender, instance, **kwargs):
+    # Only a new upload needs renditions; other saves leave storage alone
+    if instance.__dict__.pop("_image_uploaded", False):
+        generate_and_flag(instance, "image_renditions_ready")
@@ -0,0 +1,461 @@
+from decimal import Decimal
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from qent.testing import FixtureTestCase
+
+from .countries import get_country_by_abbreviation, get_country_by_id, serialized_countries, serialized_country
+from .emails import claim_batch, enqueue_emails, render_html_batch, reset_code_email, send_queued_emails
+from .models import OutboundEmail, Profile, User
+from .views import AsyncForgotPasswordView, AsyncPhoneVerifyRequestView, AsyncRegisterView, tokens_for
+
+
+class CountryRegistryTests(SimpleTestCase):
+    def test_lookups(self):
+        egypt = {"country": "Egypt", "abbreviation": "EG", "id": 62}
+        self.assertEqual(dict(get_country_by_id(62)), egypt)
+        self.assertEqual(dict(get_country_by_abbreviation("EG")), egypt)
+        self.assertEqual(serialized_country("EG"), {"id": 62, "country": "Egypt", "abbreviation": "EG"})
+        self.assertIsNone(get_country_by_id(0))
+        self.assertIsNone(get_country_by_abbreviation("XX"))
+        self.assertIsNone(serialized_country("XX"))
+
+    def test_registry_is_read_only(self):
+        with self.assertRaises(TypeError):
+            get_country_by_id(62)["country"] = "Changed"
+        serialized_country("EG")["country"] = "Changed"
+        self.assertEqual(serialized_country("EG")["country"], "Egypt")
+
+    def test_serialized_countries_keep_file_order(self):
+        countries = serialized_countries()
+        self.assertEqual(len(countries), 245)
+        self.assertEqual(dict(countries[0]), {"id": 1, "country": "Afghanistan", "abbreviation": "AF"})
+
+
+class CountriesViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **extra):
+        return self.client.get("/api/public/countries/", HTTP_HOST="localhost", **extra)
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"][0]["abbreviation"], "AF")
+        etag = response["ETag"]
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_each_page_has_its_own_etag(self):
+        first = self.get()["ETag"]
+        second = self.client.get("/api/public/countries/", {"page": 2}, HTTP_HOST="localhost")
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first)
+
+
+class ProfilePersistenceTests(FixtureTestCase):
+    """Each auth flow should write only the rows (and columns) it changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user.profile.phone = "0100"
+        cls.user.profile.save(update_fields=["phone"])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def updates(self, queries):
+        return [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+
+    def assertUpdates(self, queries, expected):
+        updates = self.updates(queries)
+        self.assertEqual(len(updates), len(expected), updates)
+        for sql, table in zip(updates, expected):
+            self.assertIn(f'UPDATE "{table}"', sql)
+
+    def test_user_save_does_not_touch_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save(update_fields=["last_login"])
+        self.assertUpdates(queries, ["authentication_user"])
+
+    def test_new_user_keeps_the_default_image_untouched(self):
+        with CaptureQueriesContext(connection) as queries:
+            user = self.create_user("new")
+        self.assertUpdates(queries, [])
+        self.assertFalse(Profile.objects.get(user=user).image_renditions_ready)
+
+    def test_save_without_a_new_image_skips_storage(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.image = "profile/user1/photo.jpg"
+        with mock.patch.object(Profile._meta.get_field("image").storage, "exists") as exists:
+            profile.save()
+        exists.assert_not_called()
+
+    def test_forgot_and_reset_password(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/forgot_password/", {"email": "user1@mail.com"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertUpdates(queries, ["authentication_profile"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/reset_password/", {
+                "code": response.data["code"],
+                "reset_token": response.data["reset_token"],
+                "password": "new-password",
+                "confirm_password": "new-password",
+            }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertUpdates(queries, ["authentication_user", "authentication_profile"])
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("new-password"))
+        self.assertIsNone(self.user.profile.reset_code)
+
+    def test_phone_verification(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/phone/request_verify_code/", {"phone": "0100"}, format="json")
+        self.assertUpdates(queries, ["authentication_profile"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/phone/confirm_verify_code/", {
+                "code": response.data["code"],
+                "verify_token": response.data["verify_token"],
+            }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertUpdates(queries, ["authentication_profile"])
+        self.assertTrue(response.data["user"]["phone_is_verified"])
+
+    def test_profile_edit(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch("/api/auth/profile/edit", {"full_name": "New Name"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertUpdates(queries, ["authentication_profile"])
+        self.assertEqual(response.data["data"]["full_name"], "New Name")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch("/api/auth/profile/edit", {"email": "new@mail.com"}, format="json")
+        self.assertUpdates(queries, ["authentication_user"])
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class EmailLoginTests(FixtureTestCase):
+    def login(self, email="user1@mail.com", password="password123"):
+        return APIClient().post("/api/auth/login/", {"email": email, "password": password}, format="json")
+
+    def test_login_with_email(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"]["email"], "user1@mail.com")
+        self.assertEqual(set(response.data["tokens"]), {"access", "refresh"})
+
+    def test_unknown_email(self):
+        response = self.login(email="nobody@mail.com")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"]["message"], "User not found")
+
+    def test_wrong_password(self):
+        response = self.login(password="wrong-password")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"]["message"], "Wrong password")
+
+    def test_changed_iterations_rehash_on_login(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+        with override_settings(PASSWORD_HASH_ITERATIONS=1200):
+            self.assertEqual(self.login().status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1200$"))
+        self.assertEqual(self.login().status_code, 200)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class UserResponseQueryTests(FixtureTestCase):
+    """User responses read the user, profile and location in one joined query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user.profile.phone = "0100"
+        cls.user.profile.location = cls.location
+        cls.user.profile.save(update_fields=["phone", "location"])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for(self.user)['access']}")
+
+    def test_profile(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/auth/profile/")
+        self.assertEqual(response.data["data"]["location"]["name"], "Nasr City, Cairo")
+
+    def test_login(self):
+        # The user lookup, then the refresh token's blacklist record
+        with self.assertNumQueries(2):
+            response = APIClient().post(
+                "/api/auth/login/", {"email": "user1@mail.com", "password": "password123"}, format="json",
+            )
+        self.assertEqual(response.data["user"]["location"]["id"], 1)
+
+    def test_register(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().post("/api/auth/register/", {
+                "full_name": "New User", "email": "new@mail.com", "phone": "0111", "password": "password123",
+                "country_id": 1, "location_id": 1,
+            }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["user"]["location"]["name"], "Nasr City, Cairo")
+        reads = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and "authentication_location" in q["sql"]]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('"authentication_user"', reads[0])
+
+    def test_phone_verify(self):
+        code = self.client.post("/api/auth/phone/request_verify_code/", {"phone": "0100"}, format="json").data
+        # Authentication, the token's user with profile and location, the profile update
+        with self.assertNumQueries(3):
+            response = self.client.post("/api/auth/phone/confirm_verify_code/", {
+                "code": code["code"], "verify_token": code["verify_token"],
+            }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"]["location"]["id"], 1)
+
+
+class ProfileAdminBalanceTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = cls.create_user("admin", is_staff=True, is_superuser=True)
+        cls.profile = cls.user.profile
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def change(self, **data):
+        profile = self.profile
+        form = {
+            "user": profile.user_id, "full_name": profile.full_name, "country": profile.country,
+            "phone": "0100", "location": profile.location_id, "balance": "999999",
+            "balance_adjustment": "", "adjustment_reference": "", **data,
+        }
+        return self.client.post(f"/admin/authentication/profile/{profile.pk}/change/", form, HTTP_HOST="localhost")
+
+    def assertLedgerBalance(self, balance):
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.balance, balance)
+        total = self.profile.balance_transactions.aggregate(total=Sum("amount"))["total"]
+        self.assertEqual(total, balance)
+
+    def test_balance_is_read_only(self):
+        response = self.change(full_name="New Name")
+        self.assertEqual(response.status_code, 302)
+        self.assertLedgerBalance(Decimal("5000"))
+
+    def test_adjustments_go_through_the_ledger(self):
+        self.change(balance_adjustment="250.50", adjustment_reference="refund #1")
+        self.change(balance_adjustment="-50.50")
+        self.assertLedgerBalance(Decimal("5200"))
+        self.assertEqual(
+            list(self.profile.balance_transactions.values_list("kind", "amount", "reference")),
+            [
+                ("opening", Decimal("5000"), ""),
+                ("adjustment", Decimal("250.50"), "refund #1"),
+                ("adjustment", Decimal("-50.50"), ""),
+            ],
+        )
+
+    def test_deduction_cannot_overdraw(self):
+        response = self.change(balance_adjustment="-6000")
+        self.assertEqual(response.status_code, 200)
+        self.assertLedgerBalance(Decimal("5000"))
+
+
+class AsyncAuthViewTests(FixtureTestCase):
+    """The ASGI variants behave like their sync counterparts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user.profile.phone = "0100"
+        cls.user.profile.save(update_fields=["phone"])
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    async def test_register(self):
+        request = self.factory.post("/api/auth/register/", {
+            "full_name": "New User", "email": "new@mail.com", "phone": "0111", "password": "password123",
+            "country_id": 1, "location_id": 1,
+        }, format="json")
+        response = await AsyncRegisterView.as_view()(request)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["user"]["full_name"], "New User")
+        self.assertIn("access", response.data["tokens"])
+        user = await User.objects.select_related("profile").aget(email="new@mail.com")
+        self.assertTrue(await user.acheck_password("password123"))
+        self.assertEqual(user.profile.phone, "0111")
+
+    async def test_forgot_password_queues_email(self):
+        request = self.factory.post("/api/auth/forgot_password/", {"email": "user1@mail.com"}, format="json")
+        response = await AsyncForgotPasswordView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        profile = await Profile.objects.aget(user=self.user)
+        self.assertEqual(profile.reset_code, response.data["code"])
+        email = await OutboundEmail.objects.aget(to="user1@mail.com")
+        self.assertEqual(email.context["code"], response.data["code"])
+
+    async def test_forgot_password_unknown_email(self):
+        request = self.factory.post("/api/auth/forgot_password/", {"email": "nobody@mail.com"}, format="json")
+        response = await AsyncForgotPasswordView.as_view()(request)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_phone_verify_request(self):
+        user = await User.objects.select_related("profile__location").aget(pk=self.user.pk)
+        request = self.factory.post("/api/auth/phone/request_verify_code/", {"phone": "0100"}, format="json")
+        force_authenticate(request, user)
+        response = await AsyncPhoneVerifyRequestView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        profile = await Profile.objects.aget(user=self.user)
+        self.assertEqual(profile.reset_code, response.data["code"])
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+class OutboundEmailTests(FixtureTestCase):
+    def forgot_password(self):
+        response = APIClient().post("/api/auth/forgot_password/", {"email": "user1@mail.com"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_forgot_password_enqueues_instead_of_sending(self):
+        response = self.forgot_password()
+        self.assertEqual(mail.outbox, [])
+
+        outbound = OutboundEmail.objects.get()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_PENDING)
+
+        call_command("send_queued_emails", stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["user1@mail.com"])
+        self.assertIn(response.data["code"], mail.outbox[0].alternatives[0][0])
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_SENT)
+
+    def test_failed_delivery_is_retried_with_backoff_then_given_up(self):
+        self.forgot_password()
+        failing = mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=SMTPException("connection refused"),
+        )
+
+        with failing:
+            call_command("send_queued_emails", stdout=StringIO())
+        outbound = OutboundEmail.objects.get()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(outbound.attempts, 1)
+        self.assertGreater(outbound.next_attempt_at, now())
+
+        OutboundEmail.objects.update(next_attempt_at=now())
+        with failing:
+            call_command("send_queued_emails", stdout=StringIO())
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(mail.outbox, [])
+
+    def test_broken_template_fails_only_its_email(self):
+        self.forgot_password()
+        broken = OutboundEmail.objects.create(
+            to="user1@mail.com", subject="Broken", text_body="-", template_name="emails/missing.html",
+        )
+
+        with self.assertLogs("authentication.emails", "WARNING"):
+            sent, failed = send_queued_emails()
+
+        self.assertEqual((sent, failed), (1, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(broken.attempts, 1)
+        self.assertIn("emails/missing.html", broken.last_error)
+        self.assertGreater(broken.next_attempt_at, now())
+
+        OutboundEmail.objects.filter(pk=broken.pk).update(next_attempt_at=now())
+        with self.assertLogs("authentication.emails", "WARNING"):
+            send_queued_emails()
+        broken.refresh_from_db()
+        self.assertEqual((broken.status, broken.attempts), (OutboundEmail.STATUS_FAILED, 2))
+
+    def test_render_html_batch(self):
+        users = [self.create_user(f"batch{i}") for i in range(3)]
+        for i, user in enumerate(users):
+            Profile.objects.filter(user=user).update(full_name=f"Name{i} Last")
+        emails = [reset_code_email(User.objects.get(pk=user.pk), f"{i}{i}{i}{i}") for i, user in enumerate(users)]
+        emails.append(OutboundEmail(to="plain@mail.com", subject="Plain", text_body="No HTML"))
+        enqueue_emails(emails)
+
+        bodies = render_html_batch(OutboundEmail.objects.order_by("id"))
+
+        self.assertEqual(len(bodies), 4)
+        for i, body in enumerate(bodies[:3]):
+            self.assertIn(f"{i}{i}{i}{i}", body)
+            self.assertIn(f"Name{i}", body)
+            for j in set(range(3)) - {i}:
+                self.assertNotIn(f"Name{j}", body)
+        self.assertIsNone(bodies[3])
+
+    def test_unreachable_server_counts_as_a_failed_attempt(self):
+        self.forgot_password()
+        self.forgot_password()
+        refused = mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.open",
+            side_effect=ConnectionRefusedError("connection refused"),
+        )
+
+        with refused:
+            sent, failed = send_queued_emails()
+
+        self.assertEqual((sent, failed), (0, 2))
+        for outbound in OutboundEmail.objects.all():
+            self.assertEqual(outbound.status, OutboundEmail.STATUS_PENDING)
+            self.assertEqual(outbound.attempts, 1)
+            self.assertIn("connection refused", outbound.last_error)
+            self.assertGreater(outbound.next_attempt_at, now())
+
+        OutboundEmail.objects.update(next_attempt_at=now())
+        call_command("send_queued_emails", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_claimed_batch_is_leased_before_sending(self):
+        self.forgot_password()
+
+        def check_lease(messages):
+            # Sending happens after the claim committed
+            outbound = OutboundEmail.objects.get()
+            self.assertEqual(outbound.attempts, 1)
+            self.assertGreater(outbound.next_attempt_at, now())
+            self.assertEqual(claim_batch(10), [])
+            return len(messages)
+
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=check_lease):
+            self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_SENT)
@@ -1,6 +1,9 @@
-import os, json
+import hashlib
 import random
 from datetime import timedelta
+
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
 from .serializers import RegisterSerializer, CountrySerializer, PhoneVerificationSerializer, \
     PhoneVerificationRequestSerializer, UserSerializer, LoginSerializer, ForgotPasswordSerializer, \
     ResetPasswordSerializer, LocationSerializer, ProfileSerializer
@@ -13,58 +16,63 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework.exceptions import ValidationError
 from django.contrib.auth import get_user_model
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.conf import settings
-from django.utils.timezone import now
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import etag
 
-from .models import Location
+from .countries import countries_etag, serialized_countries
+from .emails import aenqueue_reset_code_email, enqueue_reset_code_email
+from .models import Location, optimized_user_queryset
 
 User = get_user_model()
 
-# Load countries JSON once
-COUNTRIES_FILE = os.path.join(settings.BASE_DIR, 'authentication/data/countries.json')
-with open(COUNTRIES_FILE, 'r', encoding='utf-8') as f:
-    COUNTRIES = json.load(f)
+
+def short_lived_token(user):
+    """10-minute access token used for password reset / phone verification."""
+    token = RefreshToken.for_user(user).access_token
+    token.set_exp(lifetime=timedelta(minutes=10))
+    return token
 
 
+def generate_code():
+    return str(random.randint(1000, 9999))
 
-def send_reset_code_email(user, code):
-    subject = "Qent – Reset Your Password"
-    from_email = settings.DEFAULT_FROM_EMAIL
-    to = [user.email]
 
-    text_content = f"This is your reset password code: {code}"
+def tokens_for(user):
+    refresh = RefreshToken.for_user(user)
+    return {
+        "access": str(refresh.access_token),
+        "refresh": str(refresh)
+    }
 
-    html_content = render_to_string(
-        "emails/reset_password.html",
-        {
-            "name": user.profile.full_name.split()[0] or user.username,
-            "code": code,
-            "expiry_minutes": 10,
-            "year": now().year,
-        }
-    )
 
-    email = EmailMultiAlternatives(
-        subject,
-        text_content,
-        from_email,
-        to
-    )
-    email.attach_alternative(html_content, "text/html")
-    email.send()
+def countries_page_etag(request, *args, **kwargs):
+    # One ETag per page of the (static) country list
+    key = f"{countries_etag()}:{request.GET.urlencode()}"
+    return hashlib.sha256(key.encode()).hexdigest()
 
 
+@method_decorator(etag(countries_page_etag), name="dispatch")
+@method_decorator(cache_page(60 * 60 * 24), name="dispatch")
 class CountriesView(ListAPIView):
     """
     GET utils/countries/ → Returns list of countries
+
+    Pages are built from the pre-serialized registry, cached and served
+    with an ETag so unchanged lists come back as 304.
     """
 
     serializer_class = CountrySerializer
 
     def get_queryset(self):
-        return COUNTRIES
+        return serialized_countries()
+
+    def list(self, request, *args, **kwargs):
+        countries = self.get_queryset()
+        page = self.paginate_queryset(countries)
+        if page is not None:
+            return self.get_paginated_response([dict(c) for c in page])
+        return Response([dict(c) for c in countries])
 
 
 # Create your views here.
@@ -81,14 +89,31 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             "message": "User created successfully",
-            "tokens": {
-                "access": str(refresh.access_token),
-                "refresh": str(refresh)
-            }
+            "tokens": tokens_for(user)
+        }, status=status.HTTP_201_CREATED)
+
+
+class AsyncRegisterView(AsyncAPIView):
+    """
+        POST register → Create User (served under ASGI)
+
+        Validation and token issuing (which records an outstanding token)
+        run in a worker thread; the inserts go through the async ORM.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        serializer = RegisterSerializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        user = await serializer.acreate(serializer.validated_data)
+        data = UserSerializer(user).data
+
+        return Response({
+            'user': data,
+            "message": "User created successfully",
+            "tokens": await sync_to_async(tokens_for)(user)
         }, status=status.HTTP_201_CREATED)
 
 
@@ -122,7 +147,7 @@ class LocationView(generics.ListAPIView):
 
 class LoginView(APIView):
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
         return Response(
             {
@@ -152,21 +177,47 @@ class ForgotPasswordView(APIView):
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data["email"]
 
-        user = User.objects.get(email=email)
+        user = User.objects.select_related("profile").get(email=email)
 
         # generate random 4-digit code
-        code = str(random.randint(1000, 9999))
+        code = generate_code()
         user.profile.reset_code = code
 
         # create a short-lived access token for password reset
-        token = RefreshToken.for_user(user).access_token
-        token.set_exp(lifetime=timedelta(minutes=10))
+        token = short_lived_token(user)
         user.profile.reset_token = str(token)
 
-        user.save()
+        user.profile.save(update_fields=["reset_code", "reset_token"])
+
+        # Queue the email; the send_queued_emails worker delivers it
+        enqueue_reset_code_email(user, code)
+        return Response(
+            {
+                "message": "Code sent to your email successfully",
+                "code": code,  # for testing, in production you send via email
+                "reset_token": str(token)
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class AsyncForgotPasswordView(AsyncAPIView):
+    """ForgotPasswordView for ASGI: no worker thread is held while the DB works."""
+
+    async def post(self, request):
+        serializer = ForgotPasswordSerializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        email = serializer.validated_data["email"]
+
+        user = await User.objects.select_related("profile").aget(email=email)
 
-        # Send Email
-        send_reset_code_email(user, code)
+        code = generate_code()
+        token = await sync_to_async(short_lived_token)(user)
+        user.profile.reset_code = code
+        user.profile.reset_token = str(token)
+        await user.profile.asave(update_fields=["reset_code", "reset_token"])
+
+        await aenqueue_reset_code_email(user, code)
         return Response(
             {
                 "message": "Code sent to your email successfully",
@@ -184,12 +235,14 @@ class ResetPasswordView(APIView):
         data = serializer.validated_data
         token = AccessToken(data['reset_token'])
 
-        user = User.objects.get(id=token['user_id'])
+        user = User.objects.select_related("profile").get(id=token['user_id'])
 
         user.set_password(data["password"])
+        user.save(update_fields=["password"])
+
         user.profile.reset_code = None  # clear code
         user.profile.reset_token = None  # clear token
-        user.save()
+        user.profile.save(update_fields=["reset_code", "reset_token"])
 
         return Response({"message": "Password reset successfully"}, status=status.HTTP_200_OK)
 
@@ -205,13 +258,40 @@ class PhoneVerifyRequestView(APIView):
         user = request.user
 
         # create a short-lived access token for password reset
-        token = RefreshToken.for_user(user).access_token
-        token.set_exp(lifetime=timedelta(minutes=10))
+        token = short_lived_token(user)
+        user.profile.reset_token = str(token)
+
+        reset_code = generate_code()
+        user.profile.reset_code = reset_code
+        user.profile.save(update_fields=["reset_code", "reset_token"])
+
+        if user.profile.phone != phone:
+            raise ValidationError({"message": "There is no account with the given number"})
+
+        return Response(
+            {"message": "Verification Code Sent", "code": reset_code, 'verify_token': str(token)},
+            status=status.HTTP_200_OK
+        )
+
+
+class AsyncPhoneVerifyRequestView(AsyncAPIView):
+    """PhoneVerifyRequestView for ASGI, writing through the async ORM."""
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        serializer = PhoneVerificationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        phone = serializer.validated_data['phone']
+        # Authentication already loaded the profile (ProfileJWTAuthentication)
+        user = request.user
+
+        token = await sync_to_async(short_lived_token)(user)
         user.profile.reset_token = str(token)
 
-        reset_code = str(random.randint(1000, 9999))
+        reset_code = generate_code()
         user.profile.reset_code = reset_code
-        user.profile.save()
+        await user.profile.asave(update_fields=["reset_code", "reset_token"])
 
         if user.profile.phone != phone:
             raise ValidationError({"message": "There is no account with the given number"})
@@ -235,7 +315,7 @@ class PhoneVerifyConfirmView(APIView):
             # raise a DRF validation error
             raise ValidationError({"message": "Invalid or expired token"})
 
-        user = User.objects.get(id=token['user_id'])
+        user = optimized_user_queryset().get(id=token['user_id'])
 
         reset_code = data['code']
 
@@ -245,7 +325,7 @@ class PhoneVerifyConfirmView(APIView):
         user.profile.phone_is_verified = True
         user.profile.reset_code = None
         user.profile.reset_token = None
-        user.save()
+        user.profile.save(update_fields=["phone_is_verified", "reset_code", "reset_token"])
 
         return Response({"user": UserSerializer(user).data,
                          "message": "Phone verified successfully",
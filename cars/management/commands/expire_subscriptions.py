@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cars.subscriptions import expire_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Clear is_subscribed on cars whose subscription has ended (run daily from cron or as a worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running instead of exiting after one pass")
+        parser.add_argument("--interval", type=float, default=3600, help="Seconds between passes (with --loop)")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_subscriptions()
+            self.stdout.write(self.style.SUCCESS(f"✅ Expired {expired} subscription(s)"))
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
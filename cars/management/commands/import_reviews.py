@@ -0,0 +1,45 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.reviews import import_reviews
+
+
+class Command(BaseCommand):
+    help = "Import reviews from a CSV (user_id,car_id,rate,review) or JSON list file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Path to a .csv or .json file")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Rows validated and committed together")
+
+    def handle(self, *args, **options):
+        rows = self.read_rows(options["file"])
+        created = duplicates = 0
+        errors = []
+
+        for start in range(0, len(rows), options["chunk_size"]):
+            chunk = rows[start:start + options["chunk_size"]]
+            result = import_reviews(chunk, batch_size=options["batch_size"])
+            created += result["created"]
+            duplicates += result["duplicates"]
+            errors += [{**error, "index": error["index"] + start} for error in result["errors"]]
+
+        for error in errors[:20]:
+            self.stdout.write(self.style.WARNING(f"⚠️  Row {error['index']}: {error['errors']}"))
+        if len(errors) > 20:
+            self.stdout.write(self.style.WARNING(f"⚠️  ... and {len(errors) - 20} more invalid row(s)"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {created} review(s), skipped {duplicates} duplicate(s) and {len(errors)} invalid row(s)"
+        ))
+
+    def read_rows(self, path):
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                if path.endswith(".json"):
+                    return json.load(f)
+                return list(csv.DictReader(f))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
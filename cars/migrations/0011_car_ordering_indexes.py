@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0010_car_is_subscribed_car_subscription_end_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['price', 'id'], name='car_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['daily_rent', 'id'], name='car_daily_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['weekly_rent', 'id'], name='car_weekly_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['monthly_rent', 'id'], name='car_monthly_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['yearly_rent', 'id'], name='car_yearly_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['average_rate', 'id'], name='car_average_rate_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:38
+
+import cars.models
+import qent.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0011_car_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='brand',
+            name='image',
+            field=models.ImageField(storage=qent.storage.ContentAddressedStorage(), upload_to='brands/'),
+        ),
+        migrations.AlterField(
+            model_name='carfeature',
+            name='image',
+            field=models.ImageField(storage=qent.storage.ContentAddressedStorage(), upload_to='icons/'),
+        ),
+        migrations.AlterField(
+            model_name='carimage',
+            name='image',
+            field=models.ImageField(storage=qent.storage.ContentAddressedStorage(), upload_to=cars.models.car_image_upload_path),
+        ),
+    ]
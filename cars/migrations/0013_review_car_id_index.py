@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0012_content_addressed_images'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['car', 'id'], name='review_car_id_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0012_balance_ledger'),
+        ('cars', '0014_active_subscription_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['-is_subscribed', 'id'], name='car_boost_idx'),
+        ),
+    ]
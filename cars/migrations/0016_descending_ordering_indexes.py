@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# ?ordering=-price / -daily_rent sort "f DESC NULLS LAST, id DESC", which a
+# backward scan of the ascending (f, id) indexes returns NULLs-first. SQLite
+# can't declare NULLS LAST in an index, so these exist on PostgreSQL only.
+DESCENDING_INDEXES = {
+    "car_price_desc_idx": "price",
+    "car_daily_rent_desc_idx": "daily_rent",
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, column in DESCENDING_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "cars_car" ("{column}" DESC NULLS LAST, "id" DESC)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in DESCENDING_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0015_boost_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0016_descending_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carimage',
+            name='renditions_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
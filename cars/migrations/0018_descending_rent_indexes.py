@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# The remaining nullable ?ordering= columns, as in 0016 (PostgreSQL only)
+DESCENDING_INDEXES = {
+    "car_weekly_rent_desc_idx": "weekly_rent",
+    "car_monthly_rent_desc_idx": "monthly_rent",
+    "car_yearly_rent_desc_idx": "yearly_rent",
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, column in DESCENDING_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "cars_car" ("{column}" DESC NULLS LAST, "id" DESC)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in DESCENDING_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0017_car_image_renditions_ready'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
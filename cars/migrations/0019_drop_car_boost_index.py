@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0018_descending_rent_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='car',
+            name='car_boost_idx',
+        ),
+    ]
@@ -1,10 +1,9 @@
-from xxlimited_35 import Null
-
 from django.core.validators import MinValueValidator, MaxValueValidator
 from authentication.models import User, Location
 from django.db import models
 from django.utils import timezone
 from django.utils.text import slugify
+from qent.storage import content_addressed_storage
 import os
 
 
@@ -18,7 +17,7 @@ def car_image_upload_path(instance, filename):
 
 class CarFeature(models.Model):
     name = models.CharField(max_length=50, null=False, blank=False)
-    image = models.ImageField(upload_to='icons/')
+    image = models.ImageField(upload_to='icons/', storage=content_addressed_storage)
     value = models.CharField(max_length=255, null=False, blank=False)
 
     class Meta:
@@ -41,7 +40,7 @@ class Color(models.Model):
 
 class Brand(models.Model):
     name = models.CharField(max_length=255, null=False, blank=False)
-    image = models.ImageField(upload_to='brands/')
+    image = models.ImageField(upload_to='brands/', storage=content_addressed_storage)
 
     class Meta:
         ordering = ['id']
@@ -88,6 +87,30 @@ class Car(models.Model):
 
     class Meta:
         ordering = ['id']
+        # Back the ?ordering= options of the list/search endpoints
+        indexes = [
+            models.Index(fields=['price', 'id'], name='car_price_idx'),
+            models.Index(fields=['daily_rent', 'id'], name='car_daily_rent_idx'),
+            models.Index(fields=['weekly_rent', 'id'], name='car_weekly_rent_idx'),
+            models.Index(fields=['monthly_rent', 'id'], name='car_monthly_rent_idx'),
+            models.Index(fields=['yearly_rent', 'id'], name='car_yearly_rent_idx'),
+            models.Index(fields=['average_rate', 'id'], name='car_average_rate_idx'),
+            # The nullable columns' DESC NULLS LAST orderings have PostgreSQL-only
+            # indexes, see migrations 0016 and 0018 (SQLite can't index NULLS LAST)
+            # Only the (few) subscribed cars: the expiry UPDATE and the featured
+            # listing read this instead of scanning the catalog
+            models.Index(
+                fields=['subscription_end', 'id'], condition=models.Q(is_subscribed=True),
+                name='car_active_subscription_idx',
+            ),
+        ]
+
+    @property
+    def has_active_subscription(self):
+        # is_subscribed is cleared by the expire_subscriptions job; the date
+        # check covers the time between subscription_end and its next run
+        return self.is_subscribed and self.subscription_end is not None \
+            and self.subscription_end >= timezone.now().date()
 
     def __str__(self):
         return self.name
@@ -95,7 +118,9 @@ class Car(models.Model):
 
 class CarImage(models.Model):
     car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to=car_image_upload_path)
+    image = models.ImageField(upload_to=car_image_upload_path, storage=content_addressed_storage)
+    # Set once qent.renditions wrote the resized copies (see srcset())
+    renditions_ready = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['id']
@@ -116,6 +141,10 @@ class Review(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'car'], name='user_review')
         ]
+        # Keyset pagination of a car's reviews (GetAllReviewsView)
+        indexes = [
+            models.Index(fields=['car', 'id'], name='review_car_id_idx'),
+        ]
         ordering = ['id']
 
     def __str__(self):
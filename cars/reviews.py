@@ -0,0 +1,140 @@
+"""
+Review ingestion, the Car.average_rate aggregate and the cached first page
+of each car's reviews.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce, Round
+from rest_framework.exceptions import ValidationError
+
+from authentication.models import User
+from qent.metrics import REVIEWS_CREATED
+from .models import Car, Review
+from .serializers import ReviewImportSerializer
+
+
+def refresh_average_rates(car_ids):
+    """
+    Recompute Car.average_rate (rounded mean of its reviews) for the given
+    cars in a single UPDATE. Cars without reviews keep their current rate.
+    """
+    mean_rate = (
+        Review.objects.filter(car=OuterRef("pk"))
+        .values("car")
+        .annotate(mean=Cast(Round(Avg("rate")), IntegerField()))
+        .values("mean")
+    )
+    return Car.objects.filter(pk__in=car_ids).update(
+        average_rate=Coalesce(Subquery(mean_rate), F("average_rate"))
+    )
+
+
+def reviews_version_key(car_id):
+    return f"reviews-version:{car_id}"
+
+
+def reviews_cache_version(car_id):
+    """
+    Current version of a car's cached review pages. Pages are cached under
+    the version, so bumping it invalidates every variant (rate filter, page
+    size) at once.
+    """
+    key = reviews_version_key(car_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key)
+    return version
+
+
+def invalidate_reviews_cache(car_ids):
+    """Bump the review cache version of the given cars (one cache round trip)."""
+    version = time.time_ns()
+    cache.set_many({reviews_version_key(car_id): version for car_id in car_ids}, None)
+
+
+def first_page_cache_key(car_id, request, rate, page_size):
+    # The page holds absolute image URLs, hence scheme and host
+    return (
+        f"reviews-first-page:{car_id}:{reviews_cache_version(car_id)}"
+        f":{request.scheme}://{request.get_host()}:{rate or ''}:{page_size}"
+    )
+
+
+def import_reviews(rows, batch_size=1000):
+    """
+    Validate and insert review rows ({"user_id", "car_id", "rate", "review"}).
+
+    Invalid rows and rows pointing at unknown users/cars are reported and
+    skipped; rows for a (user, car) pair that already has a review, or that
+    repeat an earlier row, are counted as duplicates. Valid rows go in with
+    one bulk INSERT per batch, and every affected car's rating is refreshed
+    once.
+
+    Returns {"created": n, "duplicates": n, "errors": [{"index", "errors"}]}.
+    """
+    child = ReviewImportSerializer()
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, child.run_validation(row)))
+        except ValidationError as exc:
+            errors.append({"index": index, "errors": exc.detail})
+
+    known_cars = set(Car.objects.filter(pk__in={r["car_id"] for _, r in valid}).values_list("pk", flat=True))
+    known_users = set(User.objects.filter(pk__in={r["user_id"] for _, r in valid}).values_list("pk", flat=True))
+
+    reviews, pairs, duplicates = [], set(), 0
+    for index, row in valid:
+        missing = {}
+        if row["car_id"] not in known_cars:
+            missing["car_id"] = ["Car does not exist."]
+        if row["user_id"] not in known_users:
+            missing["user_id"] = ["User does not exist."]
+        if missing:
+            errors.append({"index": index, "errors": missing})
+        elif (row["user_id"], row["car_id"]) in pairs:
+            duplicates += 1  # repeated within the payload, the first one wins
+        else:
+            pairs.add((row["user_id"], row["car_id"]))
+            reviews.append(Review(**row))
+
+    car_ids = {review.car_id for review in reviews}
+    with transaction.atomic():
+        # Pairs reviewed already, looked up rather than inferred from table
+        # counts, which concurrent reviews of the same cars would skew
+        existing = set(
+            Review.objects
+            .filter(car_id__in=car_ids, user_id__in={user_id for user_id, _ in pairs})
+            .values_list("user_id", "car_id")
+        ) & pairs
+        reviews = [review for review in reviews if (review.user_id, review.car_id) not in existing]
+        duplicates += len(existing)
+
+        # ignore_conflicts still covers a review of the same pair committed
+        # since the lookup. Such rows are skipped silently, so count what the
+        # pairs hold now: a pair holding someone else's review is a duplicate.
+        Review.objects.bulk_create(reviews, batch_size=batch_size, ignore_conflicts=True)
+        if reviews:
+            stored = set(
+                Review.objects
+                .filter(car_id__in=car_ids, user_id__in={review.user_id for review in reviews})
+                .values_list("user_id", "car_id", "review", "rate")
+            )
+            created = sum((r.user_id, r.car_id, r.review, r.rate) in stored for r in reviews)
+        else:
+            created = 0
+        duplicates += len(reviews) - created
+        refresh_average_rates(car_ids)
+
+    # bulk_create sends no post_save, so invalidate here
+    if created:
+        invalidate_reviews_cache(car_ids)
+
+    REVIEWS_CREATED.inc(created)
+    errors.sort(key=lambda error: error["index"])
+    return {"created": created, "duplicates": duplicates, "errors": errors}
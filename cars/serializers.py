@@ -1,10 +1,14 @@
 from datetime import timedelta
+from decimal import Decimal
 from django.utils import timezone
 from django.db import transaction
 from django.db.models import Avg
 from rest_framework import serializers
 from .models import Brand, Color, CarFeature, Car, Review, CarImage
+from authentication import ledger
+from authentication.models import BalanceTransaction
 from authentication.serializers import LocationSerializer, UserSerializer
+from qent.renditions import srcset
 
 
 
@@ -39,16 +43,34 @@ class CarFeatureSerializer(serializers.ModelSerializer):
 class ReviewSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source="user.username", read_only=True)
     user_image = serializers.ImageField(source="user.profile.image", read_only=True)
+    user_image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Review
-        fields = ["id", "username", "review", "user_image", "rate"]
+        fields = ["id", "username", "review", "user_image", "user_image_srcset", "rate"]
+
+    def get_user_image_srcset(self, obj):
+        profile = obj.user.profile
+        return srcset(profile.image, self.context.get('request'), profile.image_renditions_ready)
+
+
+class ReviewImportSerializer(serializers.Serializer):
+    """One row of a bulk review import (see cars.reviews.import_reviews)."""
+    user_id = serializers.IntegerField()
+    car_id = serializers.IntegerField()
+    rate = serializers.IntegerField(min_value=1, max_value=5)
+    review = serializers.CharField(max_length=255)
 
 
 class CarImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = CarImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'srcset']
+
+    def get_srcset(self, obj):
+        return srcset(obj.image, self.context.get('request'), obj.renditions_ready)
 
 
 class CarSerializer(serializers.ModelSerializer):
@@ -59,6 +81,7 @@ class CarSerializer(serializers.ModelSerializer):
     location = serializers.SerializerMethodField()
     images = CarImageSerializer(many=True, read_only=True)
     first_image = serializers.SerializerMethodField(read_only=True)
+    first_image_srcset = serializers.SerializerMethodField(read_only=True)
     seating_capacity = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
     reviews_avg = serializers.SerializerMethodField()
@@ -66,7 +89,7 @@ class CarSerializer(serializers.ModelSerializer):
     class Meta:
         model = Car
         fields = [
-            "id", "name", "description", "owner", "first_image", "images", "car_type",
+            "id", "name", "description", "owner", "first_image", "first_image_srcset", "images", "car_type",
             "brand", "color", "car_features", "seating_capacity",
             "location", "average_rate",
             "is_for_rent", "daily_rent", "weekly_rent", "monthly_rent", "yearly_rent",
@@ -90,6 +113,12 @@ class CarSerializer(serializers.ModelSerializer):
             return image_url
         return None
 
+    def get_first_image_srcset(self, obj):
+        first_img = obj.images.first()
+        if first_img and first_img.image:
+            return srcset(first_img.image, self.context.get('request'), first_img.renditions_ready)
+        return None
+
     def get_seating_capacity(self, obj):
         if obj.seating_capacity:
             return f"{obj.seating_capacity} Seats" if obj.seating_capacity > 1 else "1 Seat"
@@ -107,13 +136,10 @@ class CarSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         car = self.instance
-        if attrs.get('is_for_rent') is True:
-            today = timezone.now().date()
-
-            if not car.subscription_end or car.subscription_end < today:
-                raise serializers.ValidationError({"message":
-                    "Car is not available for rent."
-                })
+        if attrs.get('is_for_rent') is True and not (car and car.has_active_subscription):
+            raise serializers.ValidationError({"message":
+                "Car is not available for rent."
+            })
 
         return attrs
 class CarDetailsSerializer(CarSerializer):
@@ -121,33 +147,38 @@ class CarDetailsSerializer(CarSerializer):
 
 
 class CarSubscriptionSerializer(serializers.Serializer):
+    SUBSCRIPTION_PRICE = Decimal("10")
+    SUBSCRIPTION_DAYS = 30
+
     @transaction.atomic
     def save(self, **kwargs):
         request = self.context['request']
-        car = self.context['car']
-        profile = request.user.profile
+        # Lock the car so two concurrent requests can't both subscribe it
+        car = Car.objects.select_for_update().get(pk=self.context['car'].pk)
 
         # Should be the owner
-        if car.owner != request.user:
+        if car.owner_id != request.user.id:
             raise serializers.ValidationError({"message": "You should be the owner of this car."})
 
         # Already Subscribed?
-        today = timezone.now().date()
-        if car.subscription_end and car.subscription_start >= today:
+        if car.has_active_subscription:
             raise serializers.ValidationError({"message":"Car already has active subscription."})
 
-        # Check for the balance
-        if profile.balance < 10:
+        # Charge the balance; the ledger refuses debits the balance doesn't cover
+        try:
+            ledger.debit(
+                request.user.profile, self.SUBSCRIPTION_PRICE,
+                BalanceTransaction.KIND_SUBSCRIPTION, reference=f"car:{car.pk}",
+            )
+        except ledger.InsufficientBalance:
             raise serializers.ValidationError({"message": "Insufficient balance."})
 
-        profile.balance -= 10
-        profile.save()
-
-
         #Subscribe
+        today = timezone.now().date()
         car.is_subscribed = True
         car.subscription_start = today
-        car.subscription_end = today + timedelta(days=30)
-        car.save()
+        car.subscription_end = today + timedelta(days=self.SUBSCRIPTION_DAYS)
+        car.save(update_fields=["is_subscribed", "subscription_start", "subscription_end"])
+        self.context['car'] = car
 
         return car
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from qent.renditions import generate_and_flag, is_new_upload
+from .models import CarImage, Review
+from .reviews import invalidate_reviews_cache
+
+
+@receiver(pre_save, sender=CarImage)
+def note_car_image_upload(sender, instance, raw, update_fields, **kwargs):
+    instance._image_uploaded = (
+        not raw and (update_fields is None or "image" in update_fields) and is_new_upload(instance.image)
+    )
+
+
+@receiver(post_save, sender=CarImage)
+def generate_car_image_renditions(sender, instance, **kwargs):
+    # Only a new upload needs renditions; other saves leave storage alone
+    if instance.__dict__.pop("_image_uploaded", False):
+        generate_and_flag(instance, "renditions_ready")
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_car_reviews(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_reviews_cache([instance.car_id])
@@ -0,0 +1,27 @@
+"""
+Paid car subscriptions. SubscribeCarView starts them (see
+CarSubscriptionSerializer); expire_subscriptions() ends them in bulk once
+subscription_end has passed, so readers can trust Car.is_subscribed.
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Car
+
+
+def active_subscription(today=None):
+    """Filter for cars whose subscription covers `today`."""
+    today = today or timezone.now().date()
+    return Q(is_subscribed=True, subscription_end__gte=today)
+
+
+def expire_subscriptions(today=None):
+    """
+    Clear is_subscribed on every car whose subscription ended before `today`
+    in one UPDATE (served by car_active_subscription_idx). Returns the number
+    of cars expired.
+    """
+    today = today or timezone.now().date()
+    return Car.objects.filter(
+        Q(subscription_end__lt=today) | Q(subscription_end__isnull=True), is_subscribed=True,
+    ).update(is_subscribed=False)
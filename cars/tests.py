@@ -1,3 +1,347 @@
-from django.test import TestCase
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+from django.test import Client, TransactionTestCase, override_settings
+from PIL import Image
+
+from authentication.models import BalanceTransaction, Location
+from qent.testing import FixtureMixin, FixtureTestCase
+
+from .models import Car, CarImage, Review
+from .reviews import import_reviews
+
+
+class CarOrderingTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        alexandria = Location.objects.create(id=2, name="Alexandria", lat=31.2001, lng=29.9187)
+        giza = Location.objects.create(id=3, name="Giza", lat=30.0131, lng=31.2089)
+        for name, location, price, rate in [
+            ("alex", alexandria, 300, 2), ("giza", giza, None, 5), ("cairo", cls.location, 100, 3),
+        ]:
+            cls.create_car(name, location=location, price=price, average_rate=rate)
+
+    def names(self, ordering, url="/api/cars/"):
+        response = self.client.get(url, {"ordering": ordering}, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        return [car["name"] for car in response.json()["data"]]
+
+    def test_price_sorts_empty_prices_last(self):
+        self.assertEqual(self.names("price"), ["cairo", "alex", "giza"])
+        self.assertEqual(self.names("-price"), ["alex", "cairo", "giza"])
+
+    def test_best_rated_first(self):
+        self.assertEqual(self.names("-rating"), ["giza", "cairo", "alex"])
+        self.assertEqual(self.names("-rating", url="/api/cars/search/"), ["giza", "cairo", "alex"])
+
+    def test_distance_from_profile_location(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.names("distance"), ["cairo", "giza", "alex"])
+
+    def test_distance_requires_a_user(self):
+        response = self.client.get("/api/cars/", {"ordering": "distance"}, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_field(self):
+        response = self.client.get("/api/cars/", {"ordering": "owner"}, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 400)
+
+
+class CarImageRenditionTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.car = cls.create_car()
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def srcset(self):
+        images = self.client.get(f"/api/cars/{self.car.id}/", HTTP_HOST="localhost").json()["images"]
+        return images[0]["srcset"], images[0]["image"]
+
+    def test_renditions_are_advertised_once_written(self):
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), "red").save(buffer, "JPEG")
+        car_image = CarImage.objects.create(car=self.car, image=ContentFile(buffer.getvalue(), name="photo.jpg"))
+        self.assertTrue(CarImage.objects.get(pk=car_image.pk).renditions_ready)
+        srcset, original = self.srcset()
+        self.assertTrue(srcset["thumb"]["url"].endswith("__thumb.jpg"))
+        self.assertTrue(srcset["thumb"]["webp"].endswith("__thumb.webp"))
+
+    def test_unreadable_image_falls_back_to_the_original(self):
+        with self.assertLogs("qent.renditions", "ERROR"):
+            car_image = CarImage.objects.create(car=self.car, image=ContentFile(b"not an image", name="photo.jpg"))
+
+        self.assertFalse(CarImage.objects.get(pk=car_image.pk).renditions_ready)
+        srcset, original = self.srcset()
+        self.assertEqual({size["url"] for size in srcset.values()}, {original})
+
+
+class BulkReviewImportTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = cls.create_user("admin", is_staff=True, is_superuser=True)
+        cls.users = [cls.user] + [cls.create_user(f"user{i}") for i in range(2, 4)]
+        cls.car = cls.create_car(owner=cls.admin, average_rate=1)
+        Review.objects.create(user=cls.users[0], car=cls.car, review="Old", rate=5)
+
+    def test_bulk_import(self):
+        self.client.force_login(self.admin)
+        rows = [
+            {"user_id": self.users[0].id, "car_id": self.car.id, "rate": 1, "review": "Duplicate"},
+            {"user_id": self.users[1].id, "car_id": self.car.id, "rate": 4, "review": "Good"},
+            {"user_id": self.users[2].id, "car_id": self.car.id, "rate": 4, "review": "Fine"},
+            {"user_id": self.users[2].id, "car_id": 999, "rate": 4, "review": "Unknown car"},
+            {"user_id": self.users[2].id, "car_id": self.car.id, "rate": 9, "review": "Bad rate"},
+        ]
+        response = self.client.post("/api/cars/reviews/bulk", rows, content_type="application/json", HTTP_HOST="localhost")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["created"], response.data["duplicates"]), (2, 1))
+        self.assertEqual([error["index"] for error in response.data["errors"]], [3, 4])
+        self.assertEqual(Review.objects.filter(car=self.car).count(), 3)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.average_rate, 4)  # round((5 + 4 + 4) / 3)
+
+    def test_counts_ignore_concurrent_reviews(self):
+        rows = [
+            {"user_id": self.users[1].id, "car_id": self.car.id, "rate": 4, "review": "Good"},
+            {"user_id": self.users[1].id, "car_id": self.car.id, "rate": 2, "review": "Repeated"},
+            {"user_id": self.users[2].id, "car_id": self.car.id, "rate": 5, "review": "Late"},
+        ]
+        bulk_create = Review.objects.bulk_create
+
+        def with_concurrent_reviews(*args, **kwargs):
+            # Another user's review of the same car, and a review of one of
+            # the imported pairs, commit meanwhile
+            Review.objects.create(user=self.admin, car=self.car, review="Concurrent", rate=3)
+            Review.objects.create(user=self.users[2], car=self.car, review="First", rate=3)
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Review.objects, "bulk_create", side_effect=with_concurrent_reviews):
+            result = import_reviews(rows)
+
+        self.assertEqual((result["created"], result["duplicates"]), (1, 2))
+        self.assertEqual(Review.objects.get(user=self.users[1]).review, "Good")
+        self.assertEqual(Review.objects.get(user=self.users[2]).review, "First")
+
+    def test_requires_staff(self):
+        self.client.force_login(self.users[0])
+        response = self.client.post("/api/cars/reviews/bulk", [], content_type="application/json", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 403)
+
+
+class ReviewCreateTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other = cls.create_user("user2")
+        cls.car = cls.create_car(owner=other, average_rate=1)
+        Review.objects.create(user=other, car=cls.car, review="Great", rate=5)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, car_id, rate=2):
+        return self.client.post(
+            f"/api/cars/{car_id}/reviews/add", {"review": "Okay", "rate": rate},
+            content_type="application/json", HTTP_HOST="localhost",
+        )
+
+    def test_create_returns_refreshed_rating(self):
+        response = self.post(self.car.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["review"]["rate"], 2)
+        self.assertEqual(
+            response.data["car"],
+            {"id": self.car.id, "average_rate": 4, "reviews_count": 2, "reviews_avg": 3.5},
+        )
+
+    def test_duplicate_is_rejected_by_constraint(self):
+        self.post(self.car.id)
+        response = self.post(self.car.id, rate=5)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"]["message"], ["You have already reviewed this car."])
+        self.assertEqual(Review.objects.filter(car=self.car).count(), 2)
+
+    def test_unknown_car(self):
+        self.assertEqual(self.post(999).status_code, 404)
+        self.assertFalse(Review.objects.filter(user=self.user).exists())
+
+
+class SubscriptionBalanceTests(FixtureMixin, TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        self.create_fixtures()
+        self.cars = [self.create_car(f"Car {i}") for i in range(self.THREADS)]
+
+    def hammer(self, car_ids):
+        """POST subscribe for every car id at once, one thread each."""
+        barrier = threading.Barrier(len(car_ids))
+        statuses = []
+
+        def subscribe(car_id):
+            client = Client(HTTP_HOST="localhost")
+            client.force_login(self.user)
+            barrier.wait()
+            try:
+                statuses.append(client.post(f"/api/cars/{car_id}/subscribe/").status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=subscribe, args=(car_id,)) for car_id in car_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def assertLedgerMatches(self, balance):
+        profile = self.user.profile
+        profile.refresh_from_db()
+        self.assertEqual(profile.balance, balance)
+        total = profile.balance_transactions.aggregate(total=Sum("amount"))["total"]
+        self.assertEqual(total, balance)
+
+    def test_concurrent_subscriptions_never_overdraw(self):
+        self.user.profile.balance_transactions.all().delete()
+        type(self.user.profile).objects.filter(pk=self.user.profile.pk).update(balance=Decimal("35"))
+        BalanceTransaction.objects.create(
+            profile=self.user.profile, kind=BalanceTransaction.KIND_ADJUSTMENT,
+            amount=Decimal("35"), balance_after=Decimal("35"),
+        )
+
+        statuses = self.hammer([car.id for car in self.cars])
+
+        self.assertEqual(statuses, [200] * 3 + [400] * (self.THREADS - 3))
+        self.assertEqual(Car.objects.filter(is_subscribed=True).count(), 3)
+        self.assertLedgerMatches(Decimal("5"))
+
+    def test_concurrent_requests_subscribe_a_car_once(self):
+        statuses = self.hammer([self.cars[0].id] * self.THREADS)
+
+        self.assertEqual(statuses, [200] + [400] * (self.THREADS - 1))
+        self.assertEqual(
+            BalanceTransaction.objects.filter(kind=BalanceTransaction.KIND_SUBSCRIPTION).count(), 1,
+        )
+        self.assertLedgerMatches(Decimal("4990"))
+
+
+class SubscriptionExpiryTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = timezone.now().date()
+        cls.cars = {}
+        for name, end in [("ended", today - timedelta(days=1)), ("last_day", today), ("running", today + timedelta(days=9))]:
+            cls.cars[name] = cls.create_car(
+                name, is_subscribed=True, subscription_start=end - timedelta(days=30), subscription_end=end,
+            )
+
+    def test_command_expires_ended_subscriptions_in_one_query(self):
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command("expire_subscriptions", stdout=out)
+
+        self.assertIn("Expired 1 subscription(s)", out.getvalue())
+        self.assertEqual(
+            set(Car.objects.filter(is_subscribed=True).values_list("name", flat=True)), {"last_day", "running"},
+        )
+
+    def test_ended_subscription_is_inactive_before_the_job_runs(self):
+        self.assertFalse(self.cars["ended"].has_active_subscription)
+        self.assertTrue(self.cars["last_day"].has_active_subscription)
+
+        self.client.force_login(self.user)
+        response = self.client.post(f"/api/cars/{self.cars['ended'].id}/subscribe/", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+
+    def test_featured_lists_active_subscriptions(self):
+        cars = self.client.get("/api/cars/featured", HTTP_HOST="localhost").json()["data"]
+        self.assertEqual([car["name"] for car in cars], ["running", "last_day"])
+
+    def test_list_and_search_rank_active_subscriptions_first(self):
+        self.create_car("plain", average_rate=5)
+
+        # "ended" is still flagged until the job runs, but not boosted
+        for url in ("/api/cars/", "/api/cars/search/"):
+            cars = self.client.get(url, HTTP_HOST="localhost").json()["data"]
+            self.assertEqual([car["name"] for car in cars], ["last_day", "running", "ended", "plain"])
+
+        # An explicit ordering is not boosted
+        cars = self.client.get("/api/cars/", {"ordering": "-rating"}, HTTP_HOST="localhost").json()["data"]
+        self.assertEqual(cars[0]["name"], "plain")
+
+
+class ReviewFeedTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        users = [cls.user] + [cls.create_user(f"user{i}") for i in range(2, 9)]
+        cls.car = cls.create_car(owner=users[0], average_rate=1)
+        cls.users = users
+        for i, user in enumerate(users[:7]):
+            Review.objects.create(user=user, car=cls.car, review=f"Review {i}", rate=i % 2 + 4)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url=None, **params):
+        return self.client.get(url or f"/api/cars/{self.car.id}/reviews", params, HTTP_HOST="localhost").json()
+
+    def test_cursor_pages(self):
+        first = self.get()
+        self.assertEqual([r["review"] for r in first["data"]], [f"Review {i}" for i in range(5)])
+        second = self.get(first["links"]["next"])
+        self.assertEqual([r["review"] for r in second["data"]], ["Review 5", "Review 6"])
+        self.assertIsNone(second["links"]["next"])
+
+    def test_rate_filter(self):
+        self.assertEqual({r["rate"] for r in self.get(rate=5)["data"]}, {5})
+        self.assertEqual(self.client.get(f"/api/cars/{self.car.id}/reviews?rate=9", HTTP_HOST="localhost").status_code, 400)
+
+    def test_first_page_cached_until_new_review(self):
+        self.get(page_size=10)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.get(page_size=10)["data"]), 7)
+
+        Review.objects.create(user=self.users[7], car=self.car, review="New", rate=1)
+        self.assertEqual(len(self.get(page_size=10)["data"]), 8)
+
+    def test_cached_first_page_links_follow_the_request(self):
+        url = f"/api/cars/{self.car.id}/reviews"
+        self.client.get(url, HTTP_HOST="localhost")
+
+        with self.assertNumQueries(0):
+            links = self.client.get(url, {"lang": "ar"}, HTTP_HOST="localhost").json()["links"]
+        self.assertTrue(links["next"].startswith(f"http://localhost{url}?"))
+        self.assertIn("lang=ar", links["next"])
+
+        https = self.client.get(url, HTTP_HOST="localhost", secure=True).json()["links"]
+        self.assertTrue(https["next"].startswith("https://"))
+        second = self.get(links["next"])
+        self.assertEqual([r["review"] for r in second["data"]], ["Review 5", "Review 6"])
+
+    def test_delete_and_bulk_import_invalidate_first_page(self):
+        self.get(page_size=10)
+        Review.objects.filter(user=self.users[6]).delete()
+        self.assertEqual(len(self.get(page_size=10)["data"]), 6)
+
+        import_reviews([{"user_id": self.users[7].id, "car_id": self.car.id, "rate": 3, "review": "Imported"}])
+        self.assertEqual(len(self.get(page_size=10)["data"]), 7)
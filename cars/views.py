@@ -1,13 +1,22 @@
 import math
-from django.db.models import Q, Min, Max
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Case, Count, Q, Min, Max, F, Value, When, FloatField, IntegerField
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from qent.metrics import CAR_SEARCHES, CAR_SUBSCRIPTIONS, NEAREST_CAR_LOOKUPS, REVIEWS_CREATED
+from qent.pagination import ReviewCursorPagination
 from .models import Car, Review, Brand, Color
+from .reviews import first_page_cache_key, import_reviews, refresh_average_rates
+from .subscriptions import active_subscription
 from .serializers import CarSerializer, ReviewSerializer, BrandSerializer, ColorSerializer, CarDetailsSerializer, \
     CarSubscriptionSerializer
 
@@ -22,23 +31,105 @@ def haversine(lat1, lng1, lat2, lng2):
     return R * c
 
 
+EARTH_RADIUS_KM = 6371
+
+# ordering= values accepted by the list/search endpoints -> model field
+CAR_ORDERING_FIELDS = {
+    "price": "price",
+    "daily_rent": "daily_rent",
+    "weekly_rent": "weekly_rent",
+    "monthly_rent": "monthly_rent",
+    "yearly_rent": "yearly_rent",
+    "rating": "average_rate",
+    "distance": "distance",
+}
+
+
+def annotate_distance(queryset, lat, lng):
+    """
+    Annotate each car with its haversine distance (KM) from (lat, lng),
+    computed in SQL so the database can sort and paginate on it.
+    """
+    dlat = Radians(F("location__lat") - Value(lat))
+    dlng = Radians(F("location__lng") - Value(lng))
+    a = (
+        Power(Sin(dlat / 2), 2)
+        + Value(math.cos(math.radians(lat)))
+        * Cos(Radians(F("location__lat")))
+        * Power(Sin(dlng / 2), 2)
+    )
+    return queryset.annotate(
+        distance=Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a, output_field=FloatField()))
+    )
+
+
+def order_car_queryset(queryset, request):
+    """
+    Apply ?ordering=price,-rating,distance ... to a car queryset.
+    Empty prices sort last, and `id` is always the final tie-breaker
+    so pages stay stable. The tie-breaker follows the direction of the
+    first key, so each sort matches one of the (field, id) indexes.
+
+    Without ?ordering=, cars with an active subscription (the same test as
+    the featured list and Car.has_active_subscription) are boosted to the
+    top, so a subscription that ended before expire_subscriptions ran no
+    longer counts.
+    """
+    ordering = request.query_params.get("ordering")
+    if not ordering:
+        boosted = Case(When(active_subscription(), then=Value(1)), default=Value(0), output_field=IntegerField())
+        return queryset.order_by(boosted.desc(), "id")
+
+    order_by = []
+    for term in ordering.split(","):
+        term = term.strip()
+        descending = term.startswith("-")
+        key = term.lstrip("-")
+
+        if key not in CAR_ORDERING_FIELDS:
+            raise ValidationError({
+                "ordering": f"Invalid ordering '{term}'. Choose from: {', '.join(CAR_ORDERING_FIELDS)}."
+            })
+
+        if key == "distance" and "distance" not in queryset.query.annotations:
+            user = request.user
+            if not user.is_authenticated or not user.profile.location_id:
+                raise ValidationError({"ordering": "Ordering by distance requires a user with a location."})
+            location = user.profile.location
+            queryset = annotate_distance(queryset, float(location.lat), float(location.lng))
+
+        field = F(CAR_ORDERING_FIELDS[key])
+        # NULLS LAST only where there can be NULLs; on NOT NULL columns it
+        # would keep PostgreSQL from scanning the index backwards
+        nulls_last = key == "distance" or Car._meta.get_field(CAR_ORDERING_FIELDS[key]).null
+        order_by.append(
+            field.desc(nulls_last=nulls_last or None) if descending else field.asc(nulls_last=nulls_last or None)
+        )
+
+    first_descending = ordering.strip().startswith("-")
+    return queryset.order_by(*order_by, "-id" if first_descending else "id")
+
+
 def optimized_car_queryset():
     return (
         Car.objects
         .select_related("brand", "color", "location")
-        .prefetch_related("car_features", "images", "reviews")
+        .prefetch_related("car_features", "images", "reviews__user__profile")
     )
 
 
 # List all cars
 class CarListView(generics.ListAPIView):
     serializer_class = CarSerializer
-    queryset = optimized_car_queryset()
+
+    def get_queryset(self):
+        return order_car_queryset(optimized_car_queryset(), self.request)
 
 
 # Retrieve car details (with reviews)
 class CarDetailView(generics.RetrieveAPIView):
-    queryset = optimized_car_queryset()
+    # owner is rendered with the flattened UserSerializer
+    queryset = optimized_car_queryset().select_related("owner__profile__location")
     serializer_class = CarDetailsSerializer
 
 
@@ -47,11 +138,20 @@ class BestCarsListView(generics.ListAPIView):
     serializer_class = CarSerializer
 
 
+class FeaturedCarsListView(generics.ListAPIView):
+    """Subscribed cars, latest subscriptions first (car_active_subscription_idx)."""
+    serializer_class = CarSerializer
+
+    def get_queryset(self):
+        return optimized_car_queryset().filter(active_subscription()).order_by('-subscription_end', '-id')[:6]
+
+
 class NearestCarListView(generics.ListAPIView):
     serializer_class = CarSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        NEAREST_CAR_LOOKUPS.inc()
         user = self.request.user
         if not user.profile.location:
             return Car.objects.none()  # If user has no location
@@ -74,6 +174,13 @@ class NearestCarListView(generics.ListAPIView):
         return Car.objects.filter(id__in=nearest_cars_ids)
 
 
+# Query params reported per search in qent_car_searches_total
+SEARCH_FILTERS = [
+    "query", "brand_id", "car_type", "type", "rental_time", "min_price", "max_price",
+    "location_id", "color_id", "seating_capacity", "fuel_type", "ordering",
+]
+
+
 class CarSearchView(generics.ListAPIView):
     serializer_class = CarSerializer
 
@@ -151,9 +258,13 @@ class CarSearchView(generics.ListAPIView):
                 car_features__value__in=fuels
             ).distinct()
 
-        return queryset
+        return order_car_queryset(queryset, self.request)
 
     def list(self, request, *args, **kwargs):
+        used = [name for name in SEARCH_FILTERS if request.query_params.get(name)]
+        for name in used or ["none"]:
+            CAR_SEARCHES.labels(name).inc()
+
         queryset = self.get_queryset()
         if not queryset.exists():
             return Response({"message": "No results found"}, status=status.HTTP_200_OK)
@@ -179,6 +290,7 @@ class SubscribeCarView(APIView):
 
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        CAR_SUBSCRIPTIONS.inc()
 
         return Response(
             {"message": "Car subscribed successfully"},
@@ -187,11 +299,45 @@ class SubscribeCarView(APIView):
 
 # Get all reviews
 class GetAllReviewsView(generics.ListAPIView):
+    """
+    Reviews of a car, oldest first, with cursor pagination and ?rate=1..5.
+    The first page (no cursor) is cached per car until a review is added or
+    removed.
+    """
     serializer_class = ReviewSerializer
+    pagination_class = ReviewCursorPagination
+
+    def get_rate(self):
+        rate = self.request.query_params.get('rate')
+        if not rate:
+            return None
+        if rate not in {"1", "2", "3", "4", "5"}:
+            raise ValidationError({"rate": "Rate must be between 1 and 5."})
+        return int(rate)
 
     def get_queryset(self):
         car_id = self.kwargs.get('car_id')
-        return Review.objects.filter(car_id=car_id).select_related("user__profile")
+        queryset = Review.objects.filter(car_id=car_id).select_related("user__profile")
+        rate = self.get_rate()
+        if rate:
+            queryset = queryset.filter(rate=rate)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator.cursor_query_param in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        key = first_page_cache_key(
+            self.kwargs.get('car_id'), request, self.get_rate(), self.paginator.get_page_size(request)
+        )
+        cached = cache.get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            # Links are rebuilt per request: only the page and its cursor are shared
+            cached = {"data": response.data["data"], "next_cursor": self.paginator.next_cursor()}
+            cache.set(key, cached, settings.REVIEWS_FIRST_PAGE_CACHE_TTL)
+            return response
+        return self.paginator.first_page_response(request, cached["data"], cached["next_cursor"])
 
 
 # Add a review
@@ -199,28 +345,65 @@ class ReviewCreateView(generics.CreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    def perform_create(self, serializer):
-        car_id = self.kwargs.get("car_id")
-        serializer.save(user=self.request.user, car_id=car_id)
-
     def create(self, request, *args, **kwargs):
-        user = request.user
         car_id = self.kwargs.get('car_id')
-        car_obj = get_object_or_404(Car, id=car_id)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        if Review.objects.filter(user=user, car=car_obj).exists():
-            raise ValidationError({"message": "You have already reviewed this car."})
+        with transaction.atomic():
+            # Insert directly; the user_review constraint rejects duplicates,
+            # including concurrent submissions
+            try:
+                with transaction.atomic():
+                    serializer.save(user=request.user, car_id=car_id)
+            except IntegrityError:
+                if not Car.objects.filter(pk=car_id).exists():
+                    raise Http404("No Car matches the given query.")
+                raise ValidationError({"message": "You have already reviewed this car."})
+
+            refresh_average_rates([car_id])
+            car = get_object_or_404(
+                Car.objects.annotate(reviews_count=Count("reviews"), reviews_avg=Avg("reviews__rate"))
+                .values("id", "average_rate", "reviews_count", "reviews_avg"),
+                pk=car_id,
+            )
 
-        response = super().create(request, *args, **kwargs)
+        REVIEWS_CREATED.inc()
+        car["reviews_avg"] = round(car["reviews_avg"], 1)
         return Response(
             {
                 "message": "Review added successfully",
-                "review": response.data
+                "review": serializer.data,
+                "car": car,
             },
             status=status.HTTP_201_CREATED
         )
 
 
+# Import reviews from partner platforms
+class BulkReviewCreateView(APIView):
+    """
+    POST cars/reviews/bulk → [{"user_id", "car_id", "rate", "review"}, ...]
+
+    Inserts the valid rows in bulk; duplicates of existing reviews are
+    skipped and invalid rows are reported by index.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        rows = request.data.get("reviews") if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            raise ValidationError({"message": "Send a list of reviews."})
+        if len(rows) > settings.REVIEW_IMPORT_MAX_ROWS:
+            raise ValidationError({"message": f"At most {settings.REVIEW_IMPORT_MAX_ROWS} reviews per request."})
+
+        result = import_reviews(rows)
+        return Response(
+            {"message": f"{result['created']} review(s) imported", **result},
+            status=status.HTTP_201_CREATED if result["created"] else status.HTTP_200_OK
+        )
+
+
 class BrandListView(generics.ListAPIView):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
@@ -0,0 +1,75 @@
+"""
+Gunicorn settings for the web process (`gunicorn -c gunicorn.conf.py`).
+
+SERVER_MODE selects the interface:
+
+* "wsgi" (default) - qent.wsgi on sync workers, or gthread workers when
+  GUNICORN_THREADS > 1
+* "asgi"           - qent.asgi on uvicorn workers, for the I/O-bound
+                     endpoints (outbound email, media) and async views
+
+Every knob reads from env so Heroku-style platforms can tune it per dyno.
+"""
+import os
+import tempfile
+
+from qent.server import web_concurrency
+
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# WEB_CONCURRENCY (default 4) is also what qent.checks multiplies the DB pool size by
+workers = web_concurrency()
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+
+if SERVER_MODE == "asgi":
+    wsgi_app = "qent.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "qent.wsgi:application"
+    worker_class = "gthread" if threads > 1 else "sync"
+
+# Recycle workers after a jittered number of requests so leaks can't grow
+# unbounded and workers don't all restart at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+# Requests in flight get this long to finish on restart / recycle
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Load the app before forking so workers share memory and boot faster.
+# Safe because nothing opens a database connection at import time.
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+# Workers write Prometheus samples here and /metrics merges them (qent.metrics).
+# The directory has to exist while the config loads: preload_app imports the
+# app (and creates the metric files) before any server hook runs. The config
+# is loaded again on HUP, by which point the variable is already set.
+owns_prometheus_dir = "PROMETHEUS_MULTIPROC_DIR" not in os.environ
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "qent-prometheus")
+)
+os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be merged into this one.
+    # A directory passed in through the environment is left to its owner.
+    if not owns_prometheus_dir:
+        return
+    own_files = f"_{os.getpid()}.db"
+    for name in os.listdir(prometheus_dir):
+        if not name.endswith(own_files):
+            os.remove(os.path.join(prometheus_dir, name))
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+from .instrumentation import install_serializer_timing
+
+
+class QentConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'qent'
+
+    def ready(self):
+        import qent.checks
+
+        if settings.REQUEST_METRICS:
+            install_serializer_timing()
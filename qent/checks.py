@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core import checks
+from django.db import connections
+
+
+@checks.register("database_connections")
+def report_database_connections(app_configs, **kwargs):
+    """
+    Report the effective connection persistence / pooling settings of every
+    database at startup, and warn when the pools of all workers together can
+    exceed the server's connection limit.
+    """
+    messages = []
+    workers = settings.WEB_CONCURRENCY
+
+    for alias in connections:
+        conf = connections.settings[alias]
+        pool = conf.get("OPTIONS", {}).get("pool")
+
+        if pool:
+            pool = {} if pool is True else pool
+            min_size = pool.get("min_size", 4)
+            max_size = pool.get("max_size", min_size)
+            messages.append(checks.Info(
+                f"Database '{alias}': psycopg pool min_size={min_size}, max_size={max_size}, "
+                f"timeout={pool.get('timeout', 30)}s, health checks {'on' if conf['CONN_HEALTH_CHECKS'] else 'off'}; "
+                f"up to {workers * max_size} connections across {workers} worker(s).",
+                id="qent.I001",
+            ))
+            if "postgresql" not in conf["ENGINE"]:
+                messages.append(checks.Warning(
+                    f"Database '{alias}' enables a pool but only PostgreSQL supports one.",
+                    id="qent.W001",
+                ))
+            if workers * max_size > settings.DB_MAX_CONNECTIONS:
+                messages.append(checks.Warning(
+                    f"Database '{alias}': {workers} worker(s) x max_size {max_size} exceeds "
+                    f"DB_MAX_CONNECTIONS={settings.DB_MAX_CONNECTIONS}.",
+                    hint="Lower DB_POOL_MAX_SIZE or WEB_CONCURRENCY.",
+                    id="qent.W002",
+                ))
+        else:
+            max_age = conf["CONN_MAX_AGE"]
+            lifetime = "unlimited" if max_age is None else ("per request" if max_age == 0 else f"{max_age}s")
+            messages.append(checks.Info(
+                f"Database '{alias}': no pool, connection lifetime {lifetime} (CONN_MAX_AGE={max_age}), "
+                f"health checks {'on' if conf['CONN_HEALTH_CHECKS'] else 'off'}.",
+                id="qent.I001",
+            ))
+
+    return messages
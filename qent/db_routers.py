@@ -0,0 +1,64 @@
+"""
+Read-replica routing for the car catalog.
+
+Safe (GET/HEAD/OPTIONS) requests read catalog models - the cars app and
+Location - from one of settings.REPLICA_DATABASES. Everything else uses
+the primary:
+
+* writes, and every read of a request with an unsafe method
+* every read after the request has written anything (db_for_write pins it)
+* requests carrying the pin cookie, which ReplicaPinningMiddleware sets for
+  REPLICA_PIN_SECONDS after a write so the client reads its own writes
+  while the replicas catch up
+* code running outside a request (management commands, the email worker)
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+CATALOG_APPS = {"cars"}
+CATALOG_MODELS = {("authentication", "location")}
+PIN_COOKIE = "qent_primary"
+
+# None outside a request; {"pinned": bool, "wrote": bool, "replica": alias}
+# for the request being handled
+request_routing = ContextVar("request_routing", default=None)
+
+
+def is_catalog_model(model):
+    meta = model._meta
+    return meta.app_label in CATALOG_APPS or (meta.app_label, meta.model_name) in CATALOG_MODELS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = request_routing.get()
+        if state is None or state["pinned"] or not settings.REPLICA_DATABASES:
+            return None
+        if not is_catalog_model(model):
+            return None
+
+        # Stick to one replica per request so pages are consistent
+        if state["replica"] is None:
+            state["replica"] = random.choice(settings.REPLICA_DATABASES)
+        return state["replica"]
+
+    def db_for_write(self, model, **hints):
+        state = request_routing.get()
+        # Filling the database cache (CACHES) isn't a write the client reads back
+        if state is not None and model._meta.app_label != "django_cache":
+            state["pinned"] = state["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {"default", *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker imports before serving its first request
+BOOT_SCRIPT = "import django; django.setup(); import {}.wsgi; import {}"
+
+
+class Command(BaseCommand):
+    help = "Boot the project in a fresh interpreter with -X importtime and report the slowest imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=25, help="Number of modules to list")
+        parser.add_argument(
+            "--sort", choices=["self", "cumulative"], default="cumulative",
+            help="Rank by a module's own import time or including its dependencies",
+        )
+        parser.add_argument("--project-only", action="store_true", help="Only list modules of INSTALLED_APPS (excluding django.*)")
+
+    def handle(self, *args, **options):
+        package = settings.ROOT_URLCONF.split(".")[0]
+        script = BOOT_SCRIPT.format(package, settings.ROOT_URLCONF)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        modules = self.parse(result.stderr)
+        count, total = len(modules), sum(self_us for self_us, _ in modules.values())
+        if options["project_only"]:
+            apps = {name.split(".")[0] for name in settings.INSTALLED_APPS if not name.startswith("django.")}
+            modules = {name: times for name, times in modules.items() if name.split(".")[0] in apps}
+
+        column = 0 if options["sort"] == "self" else 1
+        ranked = sorted(modules.items(), key=lambda item: item[1][column], reverse=True)[:options["top"]]
+
+        self.stdout.write(f"{'self ms':>9} {'cumul. ms':>10}  module")
+        for name, (self_us, cumulative_us) in ranked:
+            self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}  {name}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Boot imported {count} module(s) in {total / 1000:.0f} ms"))
+
+    def parse(self, stderr):
+        """{module: (self µs, cumulative µs)} from -X importtime output."""
+        modules = {}
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        return modules
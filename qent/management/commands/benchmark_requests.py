@@ -0,0 +1,54 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.test import Client, override_settings
+
+
+class Command(BaseCommand):
+    help = "Replay GET requests in-process and report latency and per-request DB connect time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", default=["/api/cars/"], help="URL paths to request")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per path")
+
+    def handle(self, *args, **options):
+        connect_times = []
+
+        # Time every physical connect (or pool checkout) on this thread's connections
+        for connection in connections.all():
+            connect = connection.connect
+
+            def timed_connect(connect=connect):
+                start = time.perf_counter()
+                connect()
+                connect_times.append(time.perf_counter() - start)
+
+            connection.connect = timed_connect
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            client = Client()
+            for path in options["paths"]:
+                connect_times.clear()
+                latencies = []
+                for _ in range(options["requests"]):
+                    # What the WSGI handler does around each request: close
+                    # connections past CONN_MAX_AGE / return them to the pool
+                    close_old_connections()
+                    start = time.perf_counter()
+                    client.get(path)
+                    latencies.append(time.perf_counter() - start)
+                    close_old_connections()
+
+                self.report(path, latencies, connect_times)
+
+    def report(self, path, latencies, connect_times):
+        n = len(latencies)
+        p95 = statistics.quantiles(latencies, n=20)[-1] if n > 1 else latencies[0]
+        self.stdout.write(
+            f"{path}: {n} requests, "
+            f"mean {statistics.mean(latencies) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms | "
+            f"{len(connect_times)} connect(s), "
+            f"connect time {sum(connect_times) * 1000 / n:.3f} ms/request"
+        )
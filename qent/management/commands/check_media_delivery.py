@@ -0,0 +1,70 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from qent.media import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = "Request a media file through serve_media and verify its delivery headers (no nginx needed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="Path relative to MEDIA_ROOT (default: first file found)")
+        parser.add_argument(
+            "--delivery", choices=["django", "x-accel", "x-sendfile"],
+            help="Check this MEDIA_DELIVERY mode instead of the configured one",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"] or self.first_media_file()
+        delivery = options["delivery"] or settings.MEDIA_DELIVERY
+        self.failures = 0
+
+        with override_settings(MEDIA_DELIVERY=delivery, ALLOWED_HOSTS=["testserver"]):
+            client = Client()
+            url = f"{settings.MEDIA_URL}{path}"
+            self.stdout.write(f"🔎 {url} (MEDIA_DELIVERY={delivery})")
+
+            response = client.get(url)
+            self.report("GET returns 200", response.status_code == 200, response.status_code)
+            etag = response.get("ETag", "")
+            self.report("strong ETag", etag.startswith('"') and len(etag) == 66, etag)
+            immutable = "immutable" in response.get("Cache-Control", "")
+            if is_content_addressed(path):
+                self.report("immutable Cache-Control", immutable, response.get("Cache-Control"))
+            else:
+                self.report("short Cache-Control (not content-addressed)", not immutable, response.get("Cache-Control"))
+
+            if delivery == "x-accel":
+                self.report("X-Accel-Redirect set", response.has_header("X-Accel-Redirect"), response.get("X-Accel-Redirect"))
+            elif delivery == "x-sendfile":
+                self.report("X-Sendfile set", response.has_header("X-Sendfile"), response.get("X-Sendfile"))
+            else:
+                size = os.path.getsize(os.path.join(settings.MEDIA_ROOT, path))
+                response = client.get(url, HTTP_RANGE="bytes=0-9")
+                self.report(
+                    "Range returns 206", response.status_code == 206 and len(b"".join(response.streaming_content)) == min(10, size),
+                    f"{response.status_code} {response.get('Content-Range')}",
+                )
+
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.report("If-None-Match returns 304", response.status_code == 304, response.status_code)
+
+        if self.failures:
+            raise CommandError(f"{self.failures} check(s) failed")
+        self.stdout.write(self.style.SUCCESS("✅ Media delivery headers look good"))
+
+    def first_media_file(self):
+        for root, _, files in os.walk(settings.MEDIA_ROOT):
+            for name in sorted(files):
+                return os.path.relpath(os.path.join(root, name), settings.MEDIA_ROOT).replace(os.sep, "/")
+        raise CommandError("No files under MEDIA_ROOT")
+
+    def report(self, label, ok, detail):
+        if ok:
+            self.stdout.write(f"  ✔ {label}: {detail}")
+        else:
+            self.failures += 1
+            self.stdout.write(self.style.ERROR(f"  ✘ {label}: {detail}"))
@@ -0,0 +1,64 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authentication.models import Profile
+from cars.models import Brand, CarFeature, CarImage
+from qent.renditions import rendition_names
+
+# Upload directories the collector may delete from. Everything else under
+# MEDIA_ROOT (e.g. default/, the seed sources) is never touched.
+MANAGED_DIRS = ["brands", "cars", "icons", "profile"]
+
+
+class Command(BaseCommand):
+    help = "Delete uploaded media no longer referenced by Brand, CarFeature, CarImage or Profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only list what would be deleted")
+        parser.add_argument(
+            "--min-age", type=int, default=60,
+            help="Skip files modified in the last N minutes (uploads not yet saved to the DB)",
+        )
+
+    def referenced_names(self):
+        referenced = set()
+        for model in (Brand, CarFeature, CarImage, Profile):
+            for name in model.objects.exclude(image="").values_list("image", flat=True).iterator():
+                if name:
+                    referenced.add(name)
+                    referenced.update(rendition_names(name))
+        return referenced
+
+    def handle(self, *args, **options):
+        referenced = self.referenced_names()
+        cutoff = time.time() - options["min_age"] * 60
+
+        candidates = {}
+        for directory in MANAGED_DIRS:
+            for root, _, files in os.walk(os.path.join(settings.MEDIA_ROOT, directory)):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+                    if name not in referenced and os.path.getmtime(path) <= cutoff:
+                        candidates[name] = path
+
+        # Rows saved during the walk may have picked up a candidate again
+        if candidates:
+            referenced = self.referenced_names()
+
+        deleted = freed = 0
+        for name, path in candidates.items():
+            if name in referenced:
+                continue
+            size = os.path.getsize(path)
+            if not options["dry_run"]:
+                os.remove(path)
+            deleted += 1
+            freed += size
+            self.stdout.write(f"🗑  {name}")
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"✅ {verb} {deleted} file(s), {freed / 1024:.1f} KiB"))
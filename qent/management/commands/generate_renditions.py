@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from authentication.models import Profile
+from cars.models import CarImage
+from qent.renditions import generate_and_flag
+
+
+class Command(BaseCommand):
+    help = "Backfill thumbnail/card/full (+ WebP) renditions for existing car and profile images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate renditions that already exist")
+
+    def handle(self, *args, **options):
+        rows = [
+            *((car_image, "renditions_ready") for car_image in CarImage.objects.only("id", "image", "renditions_ready").iterator()),
+            *((profile, "image_renditions_ready") for profile in Profile.objects.only("id", "image", "image_renditions_ready").iterator()),
+        ]
+
+        ready = failed = 0
+        for instance, flag in rows:
+            if generate_and_flag(instance, flag, force=options["force"]):
+                ready += 1
+            else:
+                failed += 1
+                self.stderr.write(f"✘ {instance.image.name}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Renditions ready for {ready} image(s), {failed} failed"))
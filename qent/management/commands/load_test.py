@@ -0,0 +1,115 @@
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# mode:workers[xthreads]
+DEFAULT_CONFIGS = ["sync:4", "gthread:2x4", "asgi:4"]
+
+
+def parse_config(spec):
+    try:
+        mode, size = spec.split(":")
+        workers, _, threads = size.partition("x")
+        workers, threads = int(workers), int(threads or 1)
+    except ValueError:
+        raise CommandError(f"Invalid config '{spec}', expected mode:workers[xthreads] (e.g. gthread:2x4)")
+    if mode not in ("sync", "gthread", "asgi"):
+        raise CommandError(f"Unknown mode '{mode}' in '{spec}'")
+    if mode == "gthread" and threads == 1:
+        threads = 2
+    return {
+        "SERVER_MODE": "asgi" if mode == "asgi" else "wsgi",
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_THREADS": str(1 if mode == "sync" else threads),
+    }
+
+
+class Command(BaseCommand):
+    help = "Start gunicorn with each server configuration in turn and compare throughput on an endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("configs", nargs="*", default=DEFAULT_CONFIGS, help="mode:workers[xthreads], mode in sync/gthread/asgi")
+        parser.add_argument("--path", default="/api/cars/")
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent keep-alive clients")
+        parser.add_argument("--duration", type=int, default=10, help="Seconds of load per configuration")
+        parser.add_argument("--port", type=int, default=8100)
+
+    def handle(self, *args, **options):
+        results = []
+        for spec in options["configs"]:
+            env = {**os.environ, **parse_config(spec), "PORT": str(options["port"]), "GUNICORN_ACCESS_LOG": ""}
+            self.stdout.write(f"🚀 {spec}")
+            server = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+                cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                self.wait_until_ready(options["port"], options["path"], server)
+                results.append((spec, self.run_load(options)))
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+
+        self.stdout.write(f"\n{'config':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for spec, (rps, p50, p95, errors) in results:
+            self.stdout.write(f"{spec:<14} {rps:8.1f} {p50:8.1f} {p95:8.1f} {errors:7d}")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(results)} configuration(s) compared on {options['path']}"))
+
+    def wait_until_ready(self, port, path, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("gunicorn exited during startup")
+            try:
+                status, _ = self.request(http.client.HTTPConnection("127.0.0.1", port, timeout=5), path)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"gunicorn did not answer {path} within {timeout}s")
+
+    def request(self, connection, path):
+        connection.request("GET", path, headers={"Host": "localhost"})
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def run_load(self, options):
+        latencies, errors = [], []
+        deadline = time.monotonic() + options["duration"]
+
+        def client():
+            connection = http.client.HTTPConnection("127.0.0.1", options["port"], timeout=30)
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    status, _ = self.request(connection, options["path"])
+                except (OSError, http.client.HTTPException):
+                    errors.append(1)
+                    connection.close()
+                    continue
+                if status != 200:
+                    errors.append(1)
+                latencies.append(time.perf_counter() - start)
+            connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(options["concurrency"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if not latencies:
+            return 0.0, 0.0, 0.0, len(errors)
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        return (
+            len(latencies) / options["duration"],
+            statistics.median(latencies) * 1000, p95 * 1000, len(errors),
+        )
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from qent.profiling import PROFILE_HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = "Issue a signed X-Profile header value that makes a request get profiled"
+
+    def handle(self, *args, **options):
+        token = make_token()
+        minutes = settings.PROFILING_TOKEN_MAX_AGE // 60
+        self.stdout.write(f"{PROFILE_HEADER}: {token}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Valid for {minutes} minute(s)"))
@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Copy the DEV SQLite database into its local replica (stands in for streaming replication)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--replica", default="replica", help="Replica database alias")
+
+    def handle(self, *args, **options):
+        alias = options["replica"]
+        if alias not in settings.REPLICA_DATABASES:
+            raise CommandError(f"'{alias}' is not a configured replica (set DEV=True DB_SQLITE_REPLICA=True)")
+
+        primary, replica = settings.DATABASES["default"], settings.DATABASES[alias]
+        if "sqlite3" not in primary["ENGINE"] or "sqlite3" not in replica["ENGINE"]:
+            raise CommandError("Only SQLite databases can be synced this way")
+
+        source = sqlite3.connect(primary["NAME"])
+        target = sqlite3.connect(replica["NAME"])
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Copied {primary['NAME']} to {replica['NAME']}"))
@@ -0,0 +1,151 @@
+"""
+Media delivery for uploaded files (car photos, brand logos, profile pictures).
+
+settings.MEDIA_DELIVERY selects how the bytes leave the server:
+
+* "django"     - stream from Python, honouring Range and conditional requests
+                 (local runs and the check_media_delivery command)
+* "x-accel"    - hand the file to nginx via X-Accel-Redirect
+* "x-sendfile" - hand the file to Apache/lighttpd via X-Sendfile
+
+In every mode the response carries a strong ETag derived from the file
+content, and If-None-Match is answered with 304 without touching the file
+body. Only content-addressed names (<sha256 prefix>[__<rendition>].<ext>,
+see qent.storage) are sent as long-lived and immutable; anything else may
+change behind its URL and gets a short max-age.
+"""
+import hashlib
+import mimetypes
+import re
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from qent.renditions import RENDITIONS
+from qent.storage import HASH_LENGTH
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+CONTENT_ADDRESSED_RE = re.compile(
+    rf"^[0-9a-f]{{{HASH_LENGTH}}}(?:__(?:{'|'.join(RENDITIONS)}))?\.[0-9a-z]+$"
+)
+
+
+def is_content_addressed(path):
+    return bool(CONTENT_ADDRESSED_RE.match(path.rsplit("/", 1)[-1]))
+
+
+@lru_cache(maxsize=4096)
+def content_hash(path, mtime_ns, size):
+    """sha256 of the file, cached per (path, mtime, size) for the process."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_range(header, size):
+    """
+    Parse a single "bytes=start-end" range. Returns (start, end) inclusive,
+    None when the header should be ignored, or False when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def cache_headers(response, etag, stat, path):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if is_content_addressed(path):
+        response["Cache-Control"] = f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = f"public, max-age={settings.MEDIA_MUTABLE_CACHE_MAX_AGE}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    if not full_path.is_file():
+        raise Http404("File not found")
+
+    stat = full_path.stat()
+    etag = f'"{content_hash(str(full_path), stat.st_mtime_ns, stat.st_size)}"'
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return cache_headers(HttpResponseNotModified(), etag, stat, path)
+
+    content_type, encoding = mimetypes.guess_type(full_path.name)
+    content_type = content_type or "application/octet-stream"
+
+    if settings.MEDIA_DELIVERY == "x-accel":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        return cache_headers(response, etag, stat, path)
+
+    if settings.MEDIA_DELIVERY == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = str(full_path)
+        return cache_headers(response, etag, stat, path)
+
+    # Serve from Python; only honour Range when If-Range (if any) still matches
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return cache_headers(response, etag, stat, path)
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = StreamingHttpResponse(iter_file_range(full_path, start, length), content_type=content_type)
+    response["Content-Length"] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return cache_headers(response, etag, stat, path)
@@ -0,0 +1,56 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(set up in gunicorn.conf.py) and the endpoint merges them, so a scrape sees
+the whole server whichever worker answers. Without that variable (runserver,
+tests) the metrics live in the process's default registry.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# ----------------------
+# HTTP (RequestMetricsMiddleware)
+# ----------------------
+REQUESTS = Counter(
+    "qent_http_requests_total", "Requests handled, by URL name, method and status class",
+    ["view", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "qent_http_request_duration_seconds", "Time spent in the view stack, by URL name",
+    ["view"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "qent_http_request_db_seconds", "Time spent in SQL per request, by URL name",
+    ["view"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "qent_http_request_queries", "SQL queries per request, by URL name",
+    ["view"], buckets=QUERY_BUCKETS,
+)
+
+# ----------------------
+# Domain
+# ----------------------
+CAR_SEARCHES = Counter("qent_car_searches_total", "Car searches, by filter used", ["filter"])
+NEAREST_CAR_LOOKUPS = Counter("qent_nearest_car_lookups_total", "Nearest-car lookups")
+CAR_SUBSCRIPTIONS = Counter("qent_car_subscriptions_total", "Cars subscribed")
+REVIEWS_CREATED = Counter("qent_reviews_created_total", "Reviews created")
+EMAILS_QUEUED = Counter("qent_emails_queued_total", "Emails added to the outbox")
+
+
+def render_metrics():
+    """(body, content type) for the current metrics, merged across workers."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
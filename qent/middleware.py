@@ -0,0 +1,112 @@
+import cProfile
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .db_routers import PIN_COOKIE, request_routing
+from .instrumentation import RequestMetrics, current_metrics, logger, observe
+from .profiling import PROFILE_HEADER, profile_name, save_profile, valid_token
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaPinningMiddleware:
+    """
+    Scope ReplicaRouter state to the request and keep the client on the
+    primary for REPLICA_PIN_SECONDS after it wrote something.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        token = request_routing.set({"pinned": pinned, "wrote": False, "replica": None})
+        try:
+            response = self.get_response(request)
+            wrote = request_routing.get()["wrote"]
+        finally:
+            request_routing.reset(token)
+
+        if wrote and settings.REPLICA_DATABASES:
+            response.set_cookie(PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Record query count, DB time, serializer time and total time per request
+    (see qent.instrumentation). Enabled with REQUEST_METRICS=True.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        total = time.perf_counter() - start
+
+        response["Server-Timing"] = metrics.server_timing(total)
+
+        view = observe(request, response, total, metrics)
+
+        if total * 1000 >= settings.REQUEST_METRICS_SLOW_MS:
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, serializers %.0f ms%s",
+                request.method, request.path, view, total * 1000,
+                metrics.queries, metrics.db_time * 1000, metrics.serializer_time * 1000,
+                "".join(f"\n  {count}x {sql}" for sql, count in metrics.repeated_statements()),
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    cProfile single requests on demand (see qent.profiling). Requests that
+    are not picked cost a header lookup and a random draw.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.headers.get(PROFILE_HEADER)
+        requested = token is not None and valid_token(token)
+        sampled = (
+            not requested
+            and settings.PROFILING_SAMPLE_RATE > 0
+            and request.path.startswith(tuple(settings.PROFILING_PATHS))
+            and random.random() < settings.PROFILING_SAMPLE_RATE
+        )
+        if not (requested or sampled):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        if requested or duration * 1000 >= settings.PROFILING_MIN_MS:
+            response["X-Profile-Id"] = save_profile(profiler, profile_name(request, duration))
+        return response
@@ -1,12 +1,80 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.response import Response
-from urllib.parse import urlencode
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator whose count avoids an exact COUNT(*) on every page.
+
+    Counts are cached per (unordered) SQL signature for PAGINATION_COUNT_CACHE_TTL
+    seconds. On PostgreSQL, when the planner estimates more than
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD rows, the estimate is used instead of
+    counting. `count_is_approximate` tells whether the count came from the
+    cache or the planner.
+    """
+
+    count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        # Key on what decides the rows only: ordering and annotations such as
+        # the per-user distance don't change the count. Sliced querysets (top-N
+        # lists) can't be reordered and keep their SQL.
+        signature_query = queryset if queryset.query.is_sliced else queryset.order_by().values("pk")
+        sql, params = signature_query.query.sql_with_params()
+        signature = hashlib.sha256(repr((queryset.db, sql, params)).encode()).hexdigest()
+        key = f"pagination-count:{signature}"
+
+        count = cache.get(key) if settings.PAGINATION_COUNT_CACHE_TTL else None
+        if count is not None:
+            self.count_is_approximate = True
+            return count
+
+        count = self.estimated_count(queryset, sql, params)
+        if count is None:
+            count = queryset.count()
+        else:
+            self.count_is_approximate = True
+
+        if settings.PAGINATION_COUNT_CACHE_TTL:
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+        return count
+
+    def estimated_count(self, queryset, sql, params):
+        """Planner row estimate when it is above the threshold, else None."""
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql" or not settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        return estimate if estimate > settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD else None
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = 'page_size'
+    django_paginator_class = CachedCountPaginator
 
     def get_paginated_response(self, data):
         return Response({
@@ -25,7 +93,8 @@ class CustomPagination(PageNumberPagination):
                 "path": self.request.build_absolute_uri(self.request.path),
                 "per_page": self.get_page_size(self.request),
                 "to": self.page.end_index() if data else None,
-                "total": self.page.paginator.count
+                "total": self.page.paginator.count,
+                "total_is_approximate": getattr(self.page.paginator, "count_is_approximate", False),
             }
         })
 
@@ -68,3 +137,48 @@ class CustomPagination(PageNumberPagination):
         })
 
         return links
+
+
+class ReviewCursorPagination(CursorPagination):
+    """
+    Keyset pagination for a car's reviews: pages seek on (car_id, id) through
+    the review_car_id_idx index instead of counting and offsetting.
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = 'id'
+
+    def get_paginated_response(self, data):
+        return self.response(data, self.get_previous_link(), self.get_next_link())
+
+    def next_cursor(self):
+        """The cursor of the next page (the value in the next link), or None."""
+        next_link = self.get_next_link()
+        if next_link is None:
+            return None
+        return parse_qs(urlparse(next_link).query)[self.cursor_query_param][0]
+
+    def first_page_response(self, request, data, next_cursor):
+        """
+        Rebuild a first page from its data and next_cursor(), with links for
+        this request's scheme, host and query string.
+        """
+        self.request = request
+        next_link = None
+        if next_cursor is not None:
+            next_link = replace_query_param(request.build_absolute_uri(), self.cursor_query_param, next_cursor)
+        return self.response(data, None, next_link)
+
+    def response(self, data, prev_link, next_link):
+        return Response({
+            "data": data,
+            "links": {
+                "prev": prev_link,
+                "next": next_link,
+            },
+            "meta": {
+                "path": self.request.build_absolute_uri(self.request.path),
+                "per_page": self.get_page_size(self.request),
+            }
+        })
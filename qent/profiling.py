@@ -0,0 +1,69 @@
+"""
+On-demand cProfile captures of single requests (settings.REQUEST_PROFILING).
+
+A request is profiled when it carries a valid signed X-Profile header
+(`manage.py profiling_token` issues one), or at random with probability
+PROFILING_SAMPLE_RATE for paths under PROFILING_PATHS. Header-triggered
+profiles are always kept; sampled ones only when the request took at least
+PROFILING_MIN_MS. Profiles are pstats dumps in PROFILING_DIR, listed and
+downloaded by staff from /api/profiles/, and open with
+`python -m pstats <file>` or snakeviz.
+"""
+import os
+import re
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+
+PROFILE_HEADER = "X-Profile"
+TOKEN_SALT = "qent.profiling"
+NAME_RE = re.compile(r"^[\w.-]+\.prof$")
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign("profile")
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_name(request, duration):
+    path = re.sub(r"[^\w-]+", "_", request.path).strip("_") or "root"
+    timestamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    return f"{timestamp}-{request.method}-{path[:80]}-{duration * 1000:.0f}ms.prof"
+
+
+def save_profile(profiler, name):
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(settings.PROFILING_DIR, name))
+    prune_profiles()
+    return name
+
+
+def list_profiles():
+    """Stored profile names, newest first."""
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    return sorted((name for name in os.listdir(settings.PROFILING_DIR) if NAME_RE.match(name)), reverse=True)
+
+
+def prune_profiles():
+    for name in list_profiles()[settings.PROFILING_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(settings.PROFILING_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+def profile_path(name):
+    """Absolute path of a stored profile, or None for unknown / unsafe names."""
+    if not NAME_RE.match(name):
+        return None
+    path = os.path.join(settings.PROFILING_DIR, name)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,165 @@
+"""
+Derived image renditions for uploaded photos (CarImage.image, Profile.image).
+
+Each raster upload gets a resized copy per entry in RENDITIONS, in its own
+format and as WebP, stored next to the original:
+
+    cars/bmw/bmw-x5/photo.jpg
+    cars/bmw/bmw-x5/photo__thumb.jpg
+    cars/bmw/bmw-x5/photo__thumb.webp
+    ...
+
+Names are derived from the original, so serializers can build the srcset
+map without touching storage. Rows carry a flag (CarImage.renditions_ready,
+Profile.image_renditions_ready) set once the files were written; until then
+- images saved before renditions existed, or whose generation failed - and
+for vector images (SVG), the map points every size at the original.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+# name -> max width in pixels
+RENDITIONS = {
+    "thumb": 160,
+    "card": 480,
+    "full": 1280,
+}
+RASTER_FORMATS = {
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".png": "PNG",
+    ".webp": "WEBP",
+}
+
+
+def is_raster(name):
+    return os.path.splitext(name)[1].lower() in RASTER_FORMATS
+
+
+def rendition_name(name, rendition, webp=False):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}__{rendition}{'.webp' if webp else ext}"
+
+
+def rendition_names(name):
+    """Every file generate_renditions() writes for `name`."""
+    if not is_raster(name):
+        return []
+    return [rendition_name(name, r, webp) for r in RENDITIONS for webp in (False, True)]
+
+
+def save_rendition(storage, name, content):
+    # Content-addressed storage would rename the file after its bytes;
+    # renditions must keep the name derived from their original.
+    if hasattr(storage, "save_derived"):
+        return storage.save_derived(name, content)
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+
+def generate_renditions(field_file, force=False):
+    """
+    Write the resized copies of an uploaded image. Existing renditions are
+    kept unless `force` is set. Returns the names written.
+    """
+    if not field_file or not is_raster(field_file.name):
+        return []
+
+    # Pillow is only needed when an upload is processed, not at worker boot
+    from PIL import Image, ImageOps
+
+    storage = field_file.storage
+    if not force and all(storage.exists(name) for name in rendition_names(field_file.name)):
+        return []
+
+    field_file.open("rb")
+    try:
+        with Image.open(field_file) as original:
+            original = ImageOps.exif_transpose(original)
+            original.load()
+    finally:
+        field_file.close()
+
+    fmt = RASTER_FORMATS[os.path.splitext(field_file.name)[1].lower()]
+    written = []
+    for rendition, width in RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail((width, width * 4))
+        for webp in (False, True):
+            target_format = "WEBP" if webp else fmt
+            if target_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+
+            buffer = BytesIO()
+            image.save(buffer, target_format, quality=82, optimize=True)
+
+            name = rendition_name(field_file.name, rendition, webp)
+            written.append(save_rendition(storage, name, ContentFile(buffer.getvalue())))
+    return written
+
+
+def is_new_upload(field_file):
+    """
+    True for a file assigned to the field but not yet written to storage.
+    FileField.pre_save() writes it, so check before the row is saved.
+    """
+    return bool(field_file) and not field_file._committed
+
+
+def generate_and_flag(instance, flag, field="image", force=False):
+    """
+    generate_renditions() for instance.<field>, storing whether it succeeded
+    in the boolean instance.<flag>. Unreadable images are logged instead of
+    raised: the row is already saved and srcset() falls back to the original.
+    Empty and vector images have nothing to generate and leave the flag as is.
+    """
+    field_file = getattr(instance, field)
+    if not field_file or not is_raster(field_file.name):
+        return True
+
+    try:
+        generate_renditions(field_file, force=force)
+        ready = True
+    except (OSError, ValueError):
+        logger.exception("Generating renditions for %s failed", field_file.name)
+        ready = False
+
+    if getattr(instance, flag) != ready:
+        setattr(instance, flag, ready)
+        # A queryset update, so post_save doesn't fire again
+        type(instance).objects.filter(pk=instance.pk).update(**{flag: ready})
+    return ready
+
+
+def srcset(field_file, request=None, ready=True):
+    """
+    {"thumb": {"width": 160, "url": ..., "webp": ...}, "card": ..., "full": ...}
+
+    Pass the row's renditions flag as `ready`; without renditions every
+    size points at the original.
+    """
+    if not field_file:
+        return None
+
+    def url(name):
+        url = field_file.storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    if not ready or not is_raster(field_file.name):
+        original = url(field_file.name)
+        return {r: {"width": None, "url": original, "webp": None} for r in RENDITIONS}
+
+    return {
+        rendition: {
+            "width": width,
+            "url": url(rendition_name(field_file.name, rendition)),
+            "webp": url(rendition_name(field_file.name, rendition, webp=True)),
+        }
+        for rendition, width in RENDITIONS.items()
+    }
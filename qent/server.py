@@ -0,0 +1,14 @@
+"""
+Server settings shared by gunicorn.conf.py and the Django settings.
+
+Kept free of Django imports: gunicorn reads it before the app is loaded.
+"""
+import os
+
+# Worker processes per dyno/container. A fixed default rather than a
+# multiple of cpu_count(), which reports the host's CPUs inside containers.
+DEFAULT_WEB_CONCURRENCY = 4
+
+
+def web_concurrency():
+    return int(os.getenv("WEB_CONCURRENCY", DEFAULT_WEB_CONCURRENCY))
@@ -2,6 +2,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 import os
 from datetime import timedelta
+from qent.server import web_concurrency
 
 # Load .env
 load_dotenv()
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
 
     # REST & JWT
     "rest_framework",
+    "adrf",
     "rest_framework.authtoken",
     "rest_framework_simplejwt.token_blacklist",
     "drf_spectacular",
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     "django_extensions",
 
     # Custom apps
+    "qent",
     "authentication",
     'cars'
 ]
@@ -50,6 +53,7 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "qent.middleware.ReplicaPinningMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -58,16 +62,47 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Per-request query count / DB / serializer timing, Server-Timing headers,
+# slow-request log and Prometheus request metrics (see qent.instrumentation).
+# /metrics itself is always mounted, for METRICS_TOKEN bearers and staff.
+REQUEST_METRICS = os.getenv("REQUEST_METRICS", "False") == "True"
+REQUEST_METRICS_SLOW_MS = int(os.getenv("REQUEST_METRICS_SLOW_MS", 500))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+if REQUEST_METRICS:
+    MIDDLEWARE.insert(0, "qent.middleware.RequestMetricsMiddleware")
+
+# cProfile single requests: on a signed X-Profile header, or sampled on
+# PROFILING_PATHS; kept in PROFILING_DIR for staff download (see qent.profiling)
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "False") == "True"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_PATHS = os.getenv("PROFILING_PATHS", "/api/").split(",")
+PROFILING_MIN_MS = int(os.getenv("PROFILING_MIN_MS", 200))
+PROFILING_DIR = os.getenv("PROFILING_DIR", str(BASE_DIR / "profiles"))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", 200))
+PROFILING_TOKEN_MAX_AGE = int(os.getenv("PROFILING_TOKEN_MAX_AGE", 60 * 60))
+
+if REQUEST_PROFILING:
+    MIDDLEWARE.insert(0, "qent.middleware.ProfilingMiddleware")
+
 ROOT_URLCONF = "qent.urls"
 
+# Parse templates once per process outside of DEBUG
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [
             BASE_DIR / 'templates'
         ],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
@@ -82,11 +117,33 @@ WSGI_APPLICATION = "qent.wsgi.application"
 # ----------------------
 # Database
 # ----------------------
+# Either keep per-thread connections alive for DB_CONN_MAX_AGE seconds, or
+# (DB_POOL=True) use Django's native psycopg pool. The two are exclusive.
+# DB_POOL_MAX_SIZE is per worker process: keep WEB_CONCURRENCY * DB_POOL_MAX_SIZE
+# below the server's connection limit (DB_MAX_CONNECTIONS, see qent.checks).
+# Under ASGI every request runs in a fresh thread, so persistent connections
+# would pile up instead of being reused; use DB_POOL there instead.
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+WEB_CONCURRENCY = web_concurrency()  # gunicorn workers, see qent.server
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 0 if SERVER_MODE == "asgi" else 60))
+DB_POOL = os.getenv("DB_POOL", "False") == "True"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 4))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 100))
+
 if DEV:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # SQLite ignores SELECT ... FOR UPDATE; taking the write lock when a
+            # transaction starts (and waiting for it) serializes concurrent writers
+            # the way row locks do on PostgreSQL.
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
+            # A file, not the shared in-memory database, so threaded tests wait
+            # on locks instead of failing with "database table is locked".
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 else:
@@ -98,6 +155,76 @@ else:
             "PASSWORD": os.getenv("DB_PASSWORD"),
             "HOST": os.getenv("DB_HOST"),
             "PORT": os.getenv("DB_PORT"),
+            # Reuse connections across requests instead of reconnecting each time;
+            # health checks drop connections the server closed while idle.
+            "CONN_MAX_AGE": 0 if DB_POOL else DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # psycopg 3 connection pool, one per worker process
+                "pool": {
+                    "min_size": DB_POOL_MIN_SIZE,
+                    "max_size": DB_POOL_MAX_SIZE,
+                    "timeout": DB_POOL_TIMEOUT,
+                },
+            } if DB_POOL else {},
+        }
+    }
+
+# ----------------------
+# Read replicas
+# ----------------------
+# Catalog reads of safe requests go to a replica (see qent.db_routers).
+# DB_REPLICA_HOSTS=host1,host2 adds replica_1, replica_2 with the primary's
+# credentials. In DEV, DB_SQLITE_REPLICA=True adds db_replica.sqlite3 as
+# "replica"; refresh it from db.sqlite3 with `manage.py sync_sqlite_replica`.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+
+if DEV:
+    if os.getenv("DB_SQLITE_REPLICA", "False") == "True":
+        DATABASES["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db_replica.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    for i, host in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1):
+        DATABASES[f"replica_{i}"] = {
+            **DATABASES["default"],
+            "HOST": host.strip(),
+            "TEST": {"MIRROR": "default"},
+        }
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["qent.db_routers.ReplicaRouter"]
+
+# ----------------------
+# Cache
+# ----------------------
+# Holds page counts, the first page of each car's reviews and their version
+# keys, so it has to be shared by every worker and the management commands
+# (an invalidation would otherwise only reach the process that made it).
+# Redis when REDIS_URL is set (needs the redis package), else the database:
+# run `manage.py createcachetable` once. DEV is a single process and keeps
+# the in-memory cache.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+elif DEV:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "qent_cache",
         }
     }
 
@@ -106,7 +233,7 @@ else:
 # ----------------------
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.authentication.ProfileJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     'DEFAULT_PAGINATION_CLASS': 'qent.pagination.CustomPagination',
@@ -116,6 +243,19 @@ REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "qent.exceptions.custom_exception_handler"
 }
 
+# Page counts (see qent.pagination.CachedCountPaginator): cached per query
+# for this many seconds (0 = always count), and taken from the PostgreSQL
+# planner above this many estimated rows (0 = never estimate)
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv("PAGINATION_COUNT_CACHE_TTL", 30))
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(os.getenv("PAGINATION_COUNT_ESTIMATE_THRESHOLD", 10000))
+
+# Seconds the first page of a car's reviews stays cached (invalidated on
+# any new or deleted review of that car anyway)
+REVIEWS_FIRST_PAGE_CACHE_TTL = int(os.getenv("REVIEWS_FIRST_PAGE_CACHE_TTL", 60 * 10))
+
+# Largest review batch accepted by POST api/cars/reviews/bulk
+REVIEW_IMPORT_MAX_ROWS = int(os.getenv("REVIEW_IMPORT_MAX_ROWS", 5000))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Qent API Schema",
     "DESCRIPTION": "Car Store Project",
@@ -135,9 +275,27 @@ SIMPLE_JWT = {
 # ----------------------
 AUTH_USER_MODEL = "authentication.User"
 AUTHENTICATION_BACKENDS = (
+    "authentication.backends.EmailBackend",
     "django.contrib.auth.backends.ModelBackend",
 )
 
+# ----------------------
+# Password hashing
+# ----------------------
+# Login latency is dominated by the hasher's work factor. Lower
+# PASSWORD_HASH_ITERATIONS to trade hash strength for throughput under peak
+# load (Django's own default is 1,000,000). Stored hashes with a different
+# iteration count are transparently re-hashed on the next successful login,
+# so the value can be changed without resetting passwords.
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 1_000_000))
+PASSWORD_HASHERS = [
+    "authentication.hashers.TunablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 SITE_ID = 1
 
 # Use new recommended signup fields instead of deprecated ACCOUNT_EMAIL_REQUIRED
@@ -148,7 +306,10 @@ REST_USE_JWT = True
 # ----------------------
 # Email (SMTP)
 # ----------------------
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Override with e.g. django.core.mail.backends.locmem.EmailBackend or
+# django.core.mail.backends.filebased.EmailBackend (+ EMAIL_FILE_PATH) locally
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_FILE_PATH = os.getenv("EMAIL_FILE_PATH", BASE_DIR / "sent_emails")
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -156,6 +317,12 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Outbox: requests enqueue emails, `manage.py send_queued_emails --loop` delivers them
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv("EMAIL_OUTBOX_RETRY_DELAY", 30))  # seconds, doubled per attempt
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", 300))  # a claimed batch is retried after this if its worker dies
+
 # ----------------------
 # Static files
 # ----------------------
@@ -168,6 +335,18 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # ----------------------
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
+
+# How qent.media.serve_media hands files out:
+#   "django"     - stream from Python (Range/ETag aware, for local runs)
+#   "x-accel"    - nginx serves MEDIA_ACCEL_REDIRECT_PREFIX (an `internal` location aliased to MEDIA_ROOT)
+#   "x-sendfile" - Apache/lighttpd mod_xsendfile
+MEDIA_DELIVERY = os.getenv("MEDIA_DELIVERY", "django")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+# Content-addressed names (see qent.storage) never change bytes and are cached
+# as immutable; other media (seeded defaults, brand logos) only briefly, then
+# revalidated with their ETag.
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", 60 * 60 * 24 * 365))
+MEDIA_MUTABLE_CACHE_MAX_AGE = int(os.getenv("MEDIA_MUTABLE_CACHE_MAX_AGE", 300))
 # ----------------------
 # CORS & CSRF
 # ----------------------
@@ -0,0 +1,65 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_LENGTH = 32
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names uploads after their content.
+
+    A file is stored under its upload_to directory as <sha256[:32]><ext>,
+    so uploading (or re-seeding) identical bytes returns the existing path
+    instead of writing another copy.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        hashed_name = os.path.join(directory, f"{digest.hexdigest()[:HASH_LENGTH]}{ext}").replace("\\", "/")
+
+        if self.exists(hashed_name):
+            self.touch(hashed_name)
+            return hashed_name
+        return super().save(hashed_name, content, max_length)
+
+    def touch(self, name):
+        """
+        Mark a deduplicated file (and its renditions) as just uploaded, so
+        collect_media_garbage --min-age spares it until the new reference
+        is saved.
+        """
+        from .renditions import rendition_names
+
+        for path in [name, *rendition_names(name)]:
+            try:
+                os.utime(self.path(path))
+            except FileNotFoundError:
+                pass
+
+    def save_derived(self, name, content):
+        """
+        Write a file derived from a stored original (e.g. a rendition) under
+        exactly `name`, replacing any previous version.
+        """
+        if self.exists(name):
+            self.delete(name)
+        return super().save(name, content)
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,33 @@
+from django.test import TestCase
+
+from authentication.models import Location, User
+from cars.models import Brand, Car, Color
+
+
+class FixtureMixin:
+    """Rows most API tests start from: the default location (id=1), a user, a brand and a color."""
+
+    @classmethod
+    def create_fixtures(cls):
+        cls.location = Location.objects.create(id=1, name="Nasr City, Cairo", lat=30.0626, lng=31.2808)
+        cls.user = cls.create_user("user1")
+        cls.brand = Brand.objects.create(name="BMW", image="brands/bmw.png")
+        cls.color = Color.objects.create(name="Black", hex_value="#000000")
+
+    @staticmethod
+    def create_user(username, **extra):
+        return User.objects.create_user(username=username, email=f"{username}@mail.com", password="password123", **extra)
+
+    @classmethod
+    def create_car(cls, name="X5", **fields):
+        fields = {
+            "description": "-", "owner": cls.user, "brand": cls.brand, "color": cls.color,
+            "location": cls.location, "average_rate": 0, **fields,
+        }
+        return Car.objects.create(name=name, **fields)
+
+
+class FixtureTestCase(FixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
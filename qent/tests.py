@@ -0,0 +1,261 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+
+from authentication.models import Location, Profile, User
+from cars.models import Car
+
+from .db_routers import PIN_COOKIE, ReplicaRouter, request_routing
+from .instrumentation import install_serializer_timing
+from .middleware import ReplicaPinningMiddleware
+from .profiling import make_token
+from .testing import FixtureTestCase
+
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, method, model=Car, write=None, **cookies):
+        """Run a request through the middleware and return (read alias, response)."""
+        seen = {}
+
+        def view(request):
+            if write:
+                self.router.db_for_write(write)
+            seen["db"] = self.router.db_for_read(model)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)("/api/cars/")
+        request.COOKIES.update(cookies)
+        response = ReplicaPinningMiddleware(view)(request)
+        return seen["db"], response
+
+    def test_safe_catalog_reads_use_replica(self):
+        self.assertEqual(self.route("get")[0], "replica")
+        self.assertEqual(self.route("get", model=Location)[0], "replica")
+
+    def test_primary_for_non_catalog_models_and_unsafe_methods(self):
+        self.assertIsNone(self.route("get", model=User)[0])
+        self.assertIsNone(self.route("post")[0])
+
+    def test_primary_outside_requests(self):
+        self.assertIsNone(request_routing.get())
+        self.assertIsNone(self.router.db_for_read(Car))
+
+    def test_write_pins_request_and_sets_cookie(self):
+        db, response = self.route("get", write=Car)
+        self.assertIsNone(db)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        self.assertIsNone(self.route("get", **{PIN_COOKIE: "1"})[0])
+        self.assertNotIn(PIN_COOKIE, self.route("get")[1].cookies)
+
+    def test_database_cache_writes_do_not_pin(self):
+        cache_entry = DatabaseCache("qent_cache", {}).cache_model_class
+        db, response = self.route("get", write=cache_entry)
+        self.assertEqual(db, "replica")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@override_settings(
+    MIDDLEWARE=["qent.middleware.RequestMetricsMiddleware", *settings.MIDDLEWARE],
+    REQUEST_METRICS_SLOW_MS=0,
+)
+class RequestMetricsTests(FixtureTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        install_serializer_timing()
+
+    def test_server_timing_histogram_and_slow_log(self):
+        with self.assertLogs("qent.requests", "WARNING") as logs:
+            response = self.client.get("/api/cars/", HTTP_HOST="localhost")
+
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        for metric in ("db;dur=", "serialize;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        self.assertIn("Slow request GET /api/cars/ (car_list)", logs.output[0])
+        self.assertGreaterEqual(
+            REGISTRY.get_sample_value("qent_http_request_duration_seconds_count", {"view": "car_list"}), 1
+        )
+
+    def test_search_counts_filters(self):
+        def searches(name):
+            return REGISTRY.get_sample_value("qent_car_searches_total", {"filter": name}) or 0
+
+        before = searches("brand_id"), searches("query")
+        with self.assertLogs("qent.requests", "WARNING"):
+            self.client.get("/api/cars/search/?brand_id=1&query=bmw", HTTP_HOST="localhost")
+        self.assertEqual((searches("brand_id"), searches("query")), (before[0] + 1, before[1] + 1))
+
+    def test_metrics_endpoint_requires_token_or_staff(self):
+        def scrape(**headers):
+            return self.client.get("/metrics", HTTP_HOST="localhost", **headers).status_code
+
+        with self.assertLogs("qent.requests", "WARNING"):
+            self.assertEqual(scrape(), 401)
+            with override_settings(METRICS_TOKEN="secret"):
+                self.assertEqual(scrape(HTTP_AUTHORIZATION="Bearer wrong"), 401)
+                self.assertEqual(scrape(HTTP_AUTHORIZATION="Bearer secret"), 200)
+
+            self.client.force_login(self.create_user("staff", is_staff=True))
+            self.assertEqual(scrape(), 200)
+
+
+class MediaCacheHeaderTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root.name, MEDIA_DELIVERY="django"))
+
+    def cache_control(self, name):
+        path = os.path.join(self.media_root.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"image bytes")
+        response = self.client.get(f"/media/{name}", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        return response["Cache-Control"]
+
+    def test_content_addressed_names_are_immutable(self):
+        digest = "0123456789abcdef0123456789abcdef"
+        for name in (f"cars/bmw/x5/{digest}.jpg", f"cars/bmw/x5/{digest}__thumb.webp"):
+            self.assertIn("immutable", self.cache_control(name))
+
+    def test_other_names_are_revalidated(self):
+        for name in ("icons/fuel.svg", "default/profile/profile.svg", "brands/BMW.svg", "cars/0123abcd.jpg"):
+            self.assertEqual(self.cache_control(name), f"public, max-age={settings.MEDIA_MUTABLE_CACHE_MAX_AGE}")
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        override = override_settings(
+            MIDDLEWARE=["qent.middleware.ProfilingMiddleware", *settings.MIDDLEWARE],
+            PROFILING_DIR=self.directory.name,
+            PROFILING_SAMPLE_RATE=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def get(self, **headers):
+        return self.client.get("/api/cars/search/", HTTP_HOST="localhost", headers=headers)
+
+    def test_signed_header_profiles_request(self):
+        response = self.get(**{"X-Profile": make_token()})
+        self.assertTrue(os.path.isfile(os.path.join(self.directory.name, response["X-Profile-Id"])))
+
+    def test_unsigned_or_unsampled_requests_are_not_profiled(self):
+        self.assertNotIn("X-Profile-Id", self.get(**{"X-Profile": "profile:forged"}))
+        self.assertNotIn("X-Profile-Id", self.get())
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_MIN_MS=0, PROFILING_PATHS=["/api/cars/"])
+    def test_sampled_request_is_profiled(self):
+        self.assertIn("X-Profile-Id", self.get())
+
+
+class PaginationCountTests(FixtureTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Car.objects.bulk_create([
+            Car(name=f"Car {i}", description="-", owner=cls.user, brand=cls.brand, color=cls.color,
+                location=cls.location, average_rate=4, price=1000 + i)
+            for i in range(7)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def meta(self, **params):
+        """(meta, number of COUNT queries run) for the first page of /api/cars/."""
+        with CaptureQueriesContext(connection) as queries:
+            meta = self.client.get("/api/cars/", params, HTTP_HOST="localhost").json()["meta"]
+        return meta, sum("COUNT(" in q["sql"] for q in queries)
+
+    def test_count_is_cached_and_marked_approximate(self):
+        meta, counts = self.meta()
+        self.assertEqual((meta["total"], meta["total_is_approximate"], counts), (7, False, 1))
+
+        meta, counts = self.meta()
+        self.assertEqual((meta["total"], meta["total_is_approximate"], counts), (7, True, 0))
+
+    def test_orderings_share_the_cached_count(self):
+        self.meta(ordering="price")
+        for ordering in ("-rating", "-price,daily_rent"):
+            meta, counts = self.meta(ordering=ordering)
+            self.assertEqual((meta["total"], counts), (7, 0))
+
+    @override_settings(PAGINATION_COUNT_CACHE_TTL=0)
+    def test_exact_count_without_cache(self):
+        self.meta()
+        meta, counts = self.meta()
+        self.assertEqual((meta["total"], meta["total_is_approximate"], counts), (7, False, 1))
+
+
+class MediaGarbageTests(FixtureTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.storage = Profile._meta.get_field("image").storage
+
+    def upload(self, content, name="profile/user1/photo.jpg", age_minutes=0):
+        name = self.storage.save(name, ContentFile(content))
+        stamp = time.time() - age_minutes * 60
+        os.utime(self.storage.path(name), (stamp, stamp))
+        return name
+
+    def collect(self, *args):
+        out = StringIO()
+        call_command("collect_media_garbage", *args, stdout=out)
+        return out.getvalue()
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload(b"same bytes", name="profile/user1/a.jpg")
+        second = self.storage.save("profile/user1/b.jpg", ContentFile(b"same bytes"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.storage.path("profile/user1")), [os.path.basename(first)])
+        self.assertNotEqual(self.upload(b"other bytes"), first)
+
+    def test_collects_only_old_unreferenced_files(self):
+        referenced = self.upload(b"referenced", age_minutes=120)
+        Profile.objects.filter(user=self.user).update(image=referenced)
+        old = self.upload(b"old", age_minutes=120)
+        recent = self.upload(b"recent", age_minutes=5)
+
+        self.assertIn("Would delete 1 file(s)", self.collect("--dry-run"))
+        self.assertTrue(self.storage.exists(old))
+
+        output = self.collect("--min-age", "60")
+        self.assertIn(old, output)
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(referenced))
+        self.assertTrue(self.storage.exists(recent))
+
+    def test_dedupe_hit_protects_the_file_until_referenced(self):
+        stale = self.upload(b"photo", age_minutes=120)
+        # A new upload of the same bytes, whose row isn't saved yet
+        self.assertEqual(self.storage.save("profile/user1/again.jpg", ContentFile(b"photo")), stale)
+
+        self.collect()
+        self.assertTrue(self.storage.exists(stale))
@@ -5,10 +5,11 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, Spec
 from authentication.views import CountriesView, LocationView
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.static import serve
 from django.urls import re_path
 
 from cars.views import APISettings
+from qent.media import serve_media
+from qent.views import ProfileDownloadView, ProfileListView, metrics_view
 
 router = routers.SimpleRouter()
 
@@ -32,9 +33,16 @@ urlpatterns = [
 
 # Serve static & media
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-else:
+
+urlpatterns += [
+    re_path(r"^media/(?P<path>.*)$", serve_media, name="media"),
+    # Domain counters are always recorded; request metrics need REQUEST_METRICS
+    path('metrics', metrics_view, name='metrics'),
+]
+
+if settings.REQUEST_PROFILING:
     urlpatterns += [
-        re_path(r"media/(?P<path>.*)$", serve, {"document_root": settings.MEDIA_ROOT}),
+        path('api/profiles/', ProfileListView.as_view(), name='profile_list'),
+        path('api/profiles/<str:name>', ProfileDownloadView.as_view(), name='profile_download'),
     ]
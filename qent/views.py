@@ -0,0 +1,59 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import render_metrics
+from .profiling import list_profiles, profile_path
+
+
+@require_safe
+def metrics_view(request):
+    """
+    GET metrics → Prometheus text format, for scrapers sending METRICS_TOKEN
+    as "Authorization: Bearer <token>" or logged-in staff. Without a token
+    configured only staff can read it.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not (token and constant_time_compare(authorization, f"Bearer {token}")) and not request.user.is_staff:
+        return HttpResponse(status=401)
+
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+class ProfileListView(APIView):
+    """GET api/profiles/ → stored request profiles, newest first (staff only)"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "profiles": [
+                {
+                    "name": name,
+                    "size": os.path.getsize(os.path.join(settings.PROFILING_DIR, name)),
+                    "url": request.build_absolute_uri(reverse("profile_download", args=[name])),
+                }
+                for name in list_profiles()
+            ]
+        })
+
+
+class ProfileDownloadView(APIView):
+    """GET api/profiles/<name> → the pstats file (staff only)"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        path = profile_path(name)
+        if path is None:
+            raise Http404("Profile not found")
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=name)